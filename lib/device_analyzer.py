@@ -3,13 +3,39 @@
 """
 import re
 import json
+import os
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Set, Union
+from typing import List, Dict, Any, NamedTuple, Tuple, Set, Union
 import ipaddress
-from collections import Counter
+from collections import Counter, defaultdict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from functools import cached_property, lru_cache
+from itertools import combinations, islice
 from .pattern_validator import PatternValidator
 
+# События стандартного (Cisco/Huawei) формата конфигурации: один multiline-проход
+# по всему содержимому вместо построчного перебора с regex-вызовами на каждую строку
+_INTF_EVENTS_RE = re.compile(
+    r"^interface\s+(?P<iface>\S+)"
+    r"|^\s*ip address\s+(?P<ip>\S+?)(?:/(?P<cidr>\d+)|[ \t]+(?P<mask>\S+))"
+    r"|^\s*description[ \t]+(?P<desc>.+?)[ \t]*$"
+    r"|^\s*(?P<sd>shutdown)[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Предкомпилированные шаблоны для горячих путей разбора строк
+_IFACE_RE = re.compile(r'^([^\d]*[\d/]+)(?:\.(\d+))?$')
+_INTF_LINE_RE = re.compile(r"^interface\s+(\S+)", re.IGNORECASE)
+_INTF_ANY_RE = re.compile(r"^interface\s+", re.IGNORECASE)
+_INTF_MGMT_RE = re.compile(r"^interface\s+(eth0|mgmt)", re.IGNORECASE)
+_SHUTDOWN_RE = re.compile(r"^\s*shutdown\s*$", re.IGNORECASE)
+_EXIT_RE = re.compile(r"^\s*exit\s*$", re.IGNORECASE)
+_MAC_VRF_RE = re.compile(r"^mac vrf\s+\S+", re.IGNORECASE)
+_EVPN_IRB_RE = re.compile(r"^evpn irb-forwarding", re.IGNORECASE)
+
 
 class VendorPatternLoader:
     """Загрузчик шаблонов распознавания вендоров из JSON-файлов."""
@@ -50,6 +76,15 @@ class VendorPatternLoader:
                         continue
                 
                 pattern['_source_file'] = filepath.name
+
+                # Предвычисление строчных вариантов паттернов правил типа:
+                # иначе _check_type_conditions вызывает .lower() для каждого
+                # паттерна при анализе каждого устройства
+                for rule in (pattern.get("type_rules") or pattern.get("type_inference") or []):
+                    for cond in ("any", "all", "not"):
+                        if cond in rule:
+                            rule[f"_{cond}_lc"] = [p.lower() for p in rule[cond]]
+
                 self.patterns.append(pattern)
                 status = "✅" if not self.validator else "✅✓"
                 print(
@@ -81,7 +116,6 @@ class NetworkDevice:
         self.filename = self.filepath.name
         self.vendor_patterns = vendor_patterns
         self.content: str = ""
-        self.content_lines: List[str] = []
         self.content_lower: str = ""
         self.vendor: str = "unknown"
         self.device_name: str = "unknown"
@@ -97,13 +131,17 @@ class NetworkDevice:
         try:
             with open(self.filepath, 'r', encoding='utf-8', errors='ignore') as f:
                 self.content = f.read()
-            self.content_lines = [line.rstrip() for line in self.content.splitlines() if line.strip()]
             self.content_lower = self.content.lower()
             return True
         except Exception as e:
             sys.stderr.write(f"❌ Ошибка чтения файла {self.filename}: {e}\n")
             return False
 
+    @cached_property
+    def content_lines(self) -> List[str]:
+        """Непустые строки конфигурации (вычисляются лениво при первом обращении)."""
+        return [line.rstrip() for line in self.content.splitlines() if line.strip()]
+
     def _match_patterns(self, patterns: List[str], case_insensitive: bool = True) -> bool:
         """Проверяет совпадение любого паттерна с содержимым файла."""
         flags = re.IGNORECASE if case_insensitive else 0
@@ -282,41 +320,41 @@ class NetworkDevice:
             True если все условия выполнены
         """
         matched = False
-        
+
         # Проверка условия "any" (хотя бы один паттерн)
+        # Используем строчные варианты, предвычисленные при загрузке шаблонов
         if "any" in rule:
-            matched = any(pat.lower() in self.content_lower for pat in rule["any"])
-        
+            pats = rule.get("_any_lc") or [p.lower() for p in rule["any"]]
+            matched = any(pat in self.content_lower for pat in pats)
+
         # Проверка условия "all" (все паттерны)
         if "all" in rule:
-            all_matched = all(pat.lower() in self.content_lower for pat in rule["all"])
+            pats = rule.get("_all_lc") or [p.lower() for p in rule["all"]]
+            all_matched = all(pat in self.content_lower for pat in pats)
             matched = matched and all_matched if "any" in rule else all_matched
-        
+
         # Проверка условия "not" (ни один паттерн не должен совпасть)
         if "not" in rule:
-            not_matched = not any(pat.lower() in self.content_lower for pat in rule["not"])
+            pats = rule.get("_not_lc") or [p.lower() for p in rule["not"]]
+            not_matched = not any(pat in self.content_lower for pat in pats)
             matched = matched and not_matched
-        
+
         return matched
 
-    def _extract_networks_and_vlans(self, rules: Dict) -> Dict[str, Any]:
-        """Извлекает сети и VLAN согласно правилам шаблона.
-        
-        Использует универсальный метод _extract_interfaces() для извлечения сетей,
-        что исключает дублирование логики с _extract_all_ip_interfaces().
+    def _extract_networks_and_vlans(self, rules: Dict, routing_networks: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Извлекает VLAN согласно правилам шаблона.
+
+        Сети (routing_networks) передаются извне: analyze() получает их одним
+        проходом _extract_interfaces() вместе с all_ip_interfaces, что исключает
+        повторное сканирование конфигурации.
         """
         result = {
-            "routing_networks": [],
+            "routing_networks": routing_networks,
             "total_vlans": 0,
             "active_vlans": [],
             "all_vlans": []
         }
 
-        # Извлечение интерфейсов с IP через универсальный метод
-        # Это заменяет сложную логику с определением формата (MikroTik/однострочный/многострочный)
-        routing_networks, _ = self._extract_interfaces(extract_all=False)
-        result["routing_networks"] = routing_networks
-
         # Извлечение VLAN
         if "vlans" in rules:
             vlan_set = set()
@@ -394,15 +432,15 @@ class NetworkDevice:
             self.device_type = pattern.get("default_device_type", "unknown")
 
         # Этап 4: Извлечение сетей и VLAN
+        # Один проход _extract_interfaces() даёт и routing_networks,
+        # и all_ip_interfaces (для b4com) без повторного сканирования
         rules = pattern.get("network_extraction_rules", {})
-        network_info = self._extract_networks_and_vlans(rules)
+        routing_networks, self.all_ip_interfaces = self._extract_interfaces(extract_all=True)
+        network_info = self._extract_networks_and_vlans(rules, routing_networks)
         self.routing_networks = network_info["routing_networks"]
         self.total_vlans = network_info["total_vlans"]
         self.active_vlans = network_info["active_vlans"]
         self.all_vlans = network_info["all_vlans"]
-        
-        # Дополнительное извлечение всех IP интерфейсов для b4com
-        self.all_ip_interfaces = self._extract_all_ip_interfaces()
 
         # Этап 5: Извлечение дополнительной информации (BGP, Port-Channel, VXLAN, Management)
         bgp_rules = pattern.get("bgp_extraction_rules", {})
@@ -516,6 +554,7 @@ class NetworkDevice:
         }
 
         neighbor_descriptions = {}
+        evpn_set = set()
 
         for line in self.content_lines:
             # ASN
@@ -585,8 +624,11 @@ class NetworkDevice:
                     existing = next((n for n in result["neighbors"] if n["ip"] == neighbor_ip), None)
                     if existing:
                         existing["evpn_enabled"] = True
-                    result["evpn_neighbors"].append(neighbor_ip)
-        
+                    evpn_set.add(neighbor_ip)
+
+        # Дедупликация EVPN соседей (activate может повторяться в нескольких address-family)
+        result["evpn_neighbors"] = sorted(evpn_set)
+
         # Применяем описания ко всем соседям
         for neighbor in result["neighbors"]:
             if not neighbor["description"]:
@@ -623,14 +665,16 @@ class NetworkDevice:
                     if match:
                         current_pc["description"] = match.group(1).strip()
                 
-                # Channel-group members
+                # Channel-group members (без дубликатов при повторении команды)
                 if rules.get("port_channel_members_pattern"):
                     match = re.search(rules["port_channel_members_pattern"], line, re.IGNORECASE)
                     if match:
-                        current_pc["members"].append({
+                        member = {
                             "group": match.group(1),
                             "mode": match.group(2)
-                        })
+                        }
+                        if member not in current_pc["members"]:
+                            current_pc["members"].append(member)
                 
                 # VLANs
                 if rules.get("port_channel_vlans_pattern"):
@@ -639,7 +683,7 @@ class NetworkDevice:
                         current_pc["vlans"] = match.group(1)
                 
                 # Shutdown status
-                if re.search(r"^\s*shutdown\s*$", line, re.IGNORECASE):
+                if _SHUTDOWN_RE.match(line):
                     current_pc["shutdown"] = True
         
         if current_pc:
@@ -728,9 +772,9 @@ class NetworkDevice:
                         current_mac_vrf["description"] = match.group(1)
                 
                 # Выход из секции MAC VRF - новая секция или конец
-                if re.search(r"^mac vrf\s+\S+", line, re.IGNORECASE) and current_mac_vrf["name"] != line.split()[-1]:
+                if _MAC_VRF_RE.match(line) and current_mac_vrf["name"] != line.split()[-1]:
                     pass  # Обработано выше
-                elif re.search(r"^evpn irb-forwarding", line, re.IGNORECASE):
+                elif _EVPN_IRB_RE.match(line):
                     in_mac_vrf = False
         
         if current_mac_vrf:
@@ -781,7 +825,7 @@ class NetworkDevice:
                             result["mgmt_mask"] = match.group(2)
                 
                 # Выход из секции интерфейса
-                if re.search(r"^interface\s+", line, re.IGNORECASE) and not re.search(r"^interface\s+(eth0|mgmt)", line, re.IGNORECASE):
+                if _INTF_ANY_RE.match(line) and not _INTF_MGMT_RE.match(line):
                     in_mgmt_interface = False
             
             # Default route
@@ -923,7 +967,7 @@ class NetworkDevice:
                     result["enabled"] = True
 
             # Определение интерфейса
-            intf_match = re.search(r"^interface\s+(\S+)", line, re.IGNORECASE)
+            intf_match = _INTF_LINE_RE.match(line)
             if intf_match:
                 current_interface = intf_match.group(1)
                 in_lldp_agent = False
@@ -969,7 +1013,7 @@ class NetworkDevice:
                         neighbor["port_id"] = match.group(1)
 
                 # Выход из LLDP agent секции
-                if re.search(r"^\s*exit\s*$", line, re.IGNORECASE):
+                if _EXIT_RE.match(line):
                     in_lldp_agent = False
 
             # Description (сосед)
@@ -997,7 +1041,7 @@ class NetworkDevice:
 
         for line in self.content_lines:
             # Определение интерфейса
-            intf_match = re.search(r"^interface\s+(\S+)", line, re.IGNORECASE)
+            intf_match = _INTF_LINE_RE.match(line)
             if intf_match:
                 # Сохраняем статус предыдущего интерфейса
                 if current_interface:
@@ -1341,10 +1385,12 @@ class NetworkDevice:
                     })
         else:
             # Стандартный формат (Cisco/Huawei: interface X ... ip address Y)
-            for line in self.content_lines:
-                # Проверка на интерфейс
-                intf_match = re.search(r"^interface\s+(\S+)", line, re.IGNORECASE)
-                if intf_match:
+            # Один multiline-проход _INTF_EVENTS_RE по всему содержимому:
+            # итерируем только события (interface/ip address/description/shutdown),
+            # а не каждую строку конфигурации
+            for m in _INTF_EVENTS_RE.finditer(self.content):
+                iface_name = m.group("iface")
+                if iface_name:
                     # Сохраняем предыдущий интерфейс если был IP
                     if current_interface and not is_shutdown and current_interface.get('ip'):
                         intf_data = {
@@ -1353,17 +1399,17 @@ class NetworkDevice:
                             'mask': current_interface['mask'],
                             'description': current_interface.get('description', '')
                         }
-                        
+
                         if extract_all:
                             all_interfaces.append(intf_data)
-                        
+
                         routing_networks.append({
                             'interface': current_interface['name'],
                             'network': f"{current_interface['ip']}/{current_interface['mask']}"
                         })
 
                     current_interface = {
-                        'name': intf_match.group(1),
+                        'name': iface_name,
                         'ip': None,
                         'mask': None,
                         'description': ''
@@ -1373,23 +1419,14 @@ class NetworkDevice:
 
                 if current_interface:
                     # IP адрес в формате CIDR (10.7.0.0/31) или с маской (10.7.0.0 255.255.255.254)
-                    ip_cidr_match = re.search(r"ip address\s+(\S+)/(\d+)", line, re.IGNORECASE)
-                    if ip_cidr_match:
-                        current_interface['ip'] = ip_cidr_match.group(1)
-                        current_interface['mask'] = ip_cidr_match.group(2)  # CIDR префикс
-                    else:
-                        ip_mask_match = re.search(r"ip address\s+(\S+)\s+(\S+)", line, re.IGNORECASE)
-                        if ip_mask_match:
-                            current_interface['ip'] = ip_mask_match.group(1)
-                            current_interface['mask'] = ip_mask_match.group(2)
-
+                    if m.group("ip"):
+                        current_interface['ip'] = m.group("ip")
+                        current_interface['mask'] = m.group("cidr") or m.group("mask")
                     # Description
-                    desc_match = re.search(r"description\s+(.+)", line, re.IGNORECASE)
-                    if desc_match:
-                        current_interface['description'] = desc_match.group(1).strip()
-
+                    elif m.group("desc") is not None:
+                        current_interface['description'] = m.group("desc").strip()
                     # Shutdown
-                    if re.search(r"^\s*shutdown\s*$", line, re.IGNORECASE):
+                    elif m.group("sd"):
                         is_shutdown = True
 
             # Последний интерфейс
@@ -1445,20 +1482,102 @@ class NetworkDevice:
         }
 
 
+# Таблица соответствия dotted-decimal масок префиксам (33 значения)
+_MASK_TO_PREFIX = {
+    str(ipaddress.IPv4Network(f"0.0.0.0/{p}").netmask): p for p in range(33)
+}
+
+# Метаданные устройства по умолчанию: (vendor, device_type)
+_DEFAULT_META = ('N/A', 'N/A')
+
+# Битовые классы имён интерфейсов (вычисляются один раз на интерфейс,
+# проверяются в find_logical_links вместо повторных startswith)
+_F_VBDIF, _F_VLANIF, _F_100GE, _F_40GE, _F_10GE = 1, 2, 4, 8, 16
+_F_SERVICE = _F_VBDIF | _F_VLANIF
+_F_HIGH_SPEED = _F_100GE | _F_40GE | _F_10GE
+_F_HS_P2P = _F_100GE | _F_40GE
+
+
+def _name_flags(interface_name: str) -> int:
+    """Кодирует класс имени интерфейса битовой маской."""
+    if interface_name.startswith('Vbdif'):
+        return _F_VBDIF
+    if interface_name.startswith('Vlanif'):
+        return _F_VLANIF
+    if interface_name.startswith('100GE'):
+        return _F_100GE
+    if interface_name.startswith('40GE'):
+        return _F_40GE
+    if interface_name.startswith('10GE'):
+        return _F_10GE
+    return 0
+
+
+# Маски префиксов в виде 32-битных целых для быстрого вычисления адреса сети
+_PREFIX_TO_MASK = [((1 << 32) - 1) ^ ((1 << (32 - p)) - 1) for p in range(33)]
+
+
+class IntfRec(NamedTuple):
+    """Запись об интерфейсе устройства (компактнее dict, доступ по атрибутам)."""
+    interface: str
+    base_interface: str
+    subif_numbers: List[int]
+    ip: str
+    prefix: int
+    network_cidr: str
+    description: str
+    is_physical: bool
+    is_mgmt: bool
+    is_loopback: bool
+    is_p2p: bool
+    flags: int
+    source: str
+
+
+def _net_cidr(ip_str: str, prefix: int) -> str:
+    """Вычисляет адрес сети в CIDR-формате целочисленной арифметикой.
+
+    Быстрая замена ipaddress.IPv4Network(..., strict=False) + str():
+    без аллокации объектов. ValueError при некорректном адресе/префиксе.
+    """
+    octets = ip_str.split('.')
+    if len(octets) != 4 or not 0 <= prefix <= 32:
+        raise ValueError(f"Некорректный адрес '{ip_str}/{prefix}'")
+    a, b, c, d = (int(o) for o in octets)
+    if max(a, b, c, d) > 255 or min(a, b, c, d) < 0:
+        raise ValueError(f"Некорректный адрес '{ip_str}/{prefix}'")
+    addr = ((a << 24) | (b << 16) | (c << 8) | d) & _PREFIX_TO_MASK[prefix]
+    return f"{addr >> 24}.{(addr >> 16) & 255}.{(addr >> 8) & 255}.{addr & 255}/{prefix}"
+
+
+@lru_cache(maxsize=None)
+def _netmask_to_prefix(netmask: str) -> int:
+    """Преобразует маску из dotted-decimal в префикс (с кэшированием)."""
+    try:
+        netmask_str = netmask.strip()
+        # EAFP: в типичном случае маска уже задана числом префикса
+        try:
+            prefix = int(netmask_str)
+        except ValueError:
+            pass
+        else:
+            if prefix >= 0:
+                return prefix
+        prefix = _MASK_TO_PREFIX.get(netmask_str)
+        if prefix is not None:
+            return prefix
+        return ipaddress.IPv4Network(f"0.0.0.0/{netmask}").prefixlen
+    except ValueError as e:
+        raise ValueError(f"Некорректная маска '{netmask}': {e}")
+
+
 class NetworkTopologyAnalyzer:
     """Анализатор сетевой топологии на основе данных об устройствах."""
 
     @staticmethod
     def netmask_to_prefix(netmask: str) -> int:
         """Преобразует маску из dotted-decimal в префикс."""
-        try:
-            # Обработка CIDR нотации (например, "31", "30")
-            if netmask_str := netmask.strip():
-                if netmask_str.isdigit():
-                    return int(netmask_str)
-            return ipaddress.IPv4Network(f"0.0.0.0/{netmask}").prefixlen
-        except ValueError as e:
-            raise ValueError(f"Некорректная маска '{netmask}': {e}")
+        return _netmask_to_prefix(netmask)
 
     @staticmethod
     def calculate_network_address(ip_str: str, netmask_str: str) -> str:
@@ -1480,19 +1599,15 @@ class NetworkTopologyAnalyzer:
                 ip_str = network_str
                 netmask_str = '32'  # Default to host route
             
-            # Обработка CIDR нотации
-            if netmask_str.isdigit():
-                prefix = int(netmask_str)
-            else:
-                try:
-                    prefix = NetworkTopologyAnalyzer.netmask_to_prefix(netmask_str)
-                except ValueError:
-                    prefix = 32
+            # CIDR и dotted-decimal нотации обрабатываются кэшированной функцией
+            try:
+                prefix = NetworkTopologyAnalyzer.netmask_to_prefix(netmask_str)
+            except ValueError:
+                prefix = 32
             
             # Вычисляем реальный адрес сети (network address)
             try:
-                network = ipaddress.IPv4Network(f'{ip_str}/{prefix}', strict=False)
-                network_cidr = str(network)
+                network_cidr = _net_cidr(ip_str, prefix)
             except ValueError:
                 network_cidr = f"{ip_str}/{prefix}"
             
@@ -1514,35 +1629,91 @@ class NetworkTopologyAnalyzer:
             'is_p2p': False
         }
 
+    # Префиксы имён интерфейсов (startswith принимает кортеж и проверяет всё за один вызов)
+    _NON_PHYSICAL = ('MEth', 'Vbdif', 'Vlanif', 'LoopBack', 'NULL')
+    _MGMT_INDICATORS = ('MEth', 'Vbdif1360837')
+
     @staticmethod
     def is_physical_interface(interface_name: str) -> bool:
         """Определяет физический интерфейс."""
-        non_physical = ('MEth', 'Vbdif', 'Vlanif', 'LoopBack', 'NULL')
-        return not any(interface_name.startswith(prefix) for prefix in non_physical)
+        return not interface_name.startswith(NetworkTopologyAnalyzer._NON_PHYSICAL)
 
     @staticmethod
     def is_mgmt_interface(interface_name: str, is_mgmt_network: bool) -> bool:
         """Определяет управленческий интерфейс."""
-        mgmt_indicators = ('MEth', 'Vbdif1360837')
-        return (any(interface_name.startswith(prefix) for prefix in mgmt_indicators) or
+        return (interface_name.startswith(NetworkTopologyAnalyzer._MGMT_INDICATORS) or
                 (is_mgmt_network and interface_name.startswith('Vbdif')))
 
     @staticmethod
     def extract_interface_number(interface_name: str) -> Tuple[str, List[int]]:
         """Извлекает базовое имя интерфейса и номера подынтерфейсов."""
-        match = re.match(r'^([^\d]*[\d/]+)(?:\.(\d+))?$', interface_name)
+        match = _IFACE_RE.match(interface_name)
         if not match:
             return interface_name, []
         base = match.group(1)
         subif = [int(match.group(2))] if match.group(2) else []
         return base, subif
 
+    # Предикаты фильтрации интерфейсов по уже вычисленным флагам
+    _INTF_FILTERS = {
+        'physical': lambda phys, mgmt, lo, p2p: phys and p2p and not lo,
+        'mgmt': lambda phys, mgmt, lo, p2p: mgmt and not lo,
+        'logical': lambda phys, mgmt, lo, p2p: not (lo or mgmt or (phys and p2p)),
+    }
+
+    @staticmethod
+    def filter_interfaces(interfaces: List[IntfRec], filter_type: str) -> List[IntfRec]:
+        """Фильтрует уже извлечённые интерфейсы по типу ('physical'/'mgmt'/'logical')."""
+        predicate = NetworkTopologyAnalyzer._INTF_FILTERS.get(filter_type)
+        if predicate is None:
+            return interfaces
+        return [intf for intf in interfaces
+                if predicate(intf.is_physical, intf.is_mgmt, intf.is_loopback, intf.is_p2p)]
+
+    @staticmethod
+    def _collect_interfaces(devices_data: List[Dict[str, Any]]) -> Dict[str, List[IntfRec]]:
+        """Извлекает интерфейсы всех устройств одним проходом (filter_type='all')."""
+        named = [device for device in devices_data if device['device_name'] != 'unknown']
+
+        # Извлечение независимо по устройствам; на больших парках распараллеливаем
+        if len(named) > 4:
+            with ThreadPoolExecutor(max_workers=min(32, len(named))) as executor:
+                results = executor.map(NetworkTopologyAnalyzer.extract_device_interfaces, named)
+                return {device['device_name']: interfaces
+                        for device, interfaces in zip(named, results)}
+
+        return {
+            device['device_name']: NetworkTopologyAnalyzer.extract_device_interfaces(device)
+            for device in named
+        }
+
     @staticmethod
-    def extract_device_interfaces(device: Dict[str, Any], filter_type: str = 'all') -> List[Dict[str, Any]]:
+    def _build_device_metadata(devices_data: List[Dict[str, Any]]) -> Dict[str, Tuple[str, str]]:
+        """Строит маппинг имени устройства на кортеж (вендор, тип)."""
+        return {
+            device['device_name']: (device['vendor'], device['device_type'])
+            for device in devices_data
+            if device['device_name'] != 'unknown'
+        }
+
+    @staticmethod
+    def _logical_row(dev1: str, meta1: Tuple[str, str], intf1: IntfRec,
+                     dev2: str, meta2: Tuple[str, str], intf2: IntfRec,
+                     desc: str) -> List[str]:
+        """Формирует строку логической связи для отчётов."""
+        return [
+            dev1, meta1[0], meta1[1], f"{intf1.interface}/{intf1.ip}",
+            dev2, meta2[0], meta2[1], f"{intf2.interface}/{intf2.ip}",
+            desc
+        ]
+
+    @staticmethod
+    def extract_device_interfaces(device: Dict[str, Any], filter_type: str = 'all') -> List[IntfRec]:
         """Извлекает интерфейсы устройства с фильтрацией по типу."""
         interfaces = []
         device_name = device.get('device_name', 'unknown')
-        processed_networks = set()
+        seen_intf_ip: Set[Tuple[str, str]] = set()
+        predicate = NetworkTopologyAnalyzer._INTF_FILTERS.get(filter_type)
         
         # 1. Все IP интерфейсы из all_ip_interfaces (для b4com)
         for intf_entry in device.get('all_ip_interfaces', []):
@@ -1552,126 +1723,108 @@ class NetworkTopologyAnalyzer:
             description = intf_entry.get('description', '')
             
             if interface_name and ip:
-                # Преобразуем маску
-                if mask.isdigit():
-                    prefix = int(mask)
-                else:
-                    try:
-                        prefix = NetworkTopologyAnalyzer.netmask_to_prefix(mask)
-                    except ValueError:
-                        prefix = 32
+                # Пропускаем дубликаты: ключ — пара интерфейс/IP, а не подсеть,
+                # чтобы не терять разные интерфейсы в одной сети
+                if (interface_name, ip) in seen_intf_ip:
+                    continue
+                seen_intf_ip.add((interface_name, ip))
+
+                # Преобразуем маску (кэшированная функция понимает оба формата)
+                try:
+                    prefix = NetworkTopologyAnalyzer.netmask_to_prefix(mask)
+                except ValueError:
+                    prefix = 32
                 
                 # Вычисляем реальный адрес сети
                 try:
-                    network = ipaddress.IPv4Network(f'{ip}/{prefix}', strict=False)
-                    network_cidr = str(network)
+                    network_cidr = _net_cidr(ip, prefix)
                 except ValueError:
                     network_cidr = f"{ip}/{prefix}"
 
-                # Пропускаем дубликаты и loopback
-                if network_cidr in processed_networks:
+                # Дешёвые флаги вычисляются до дорогого разбора имени,
+                # чтобы при фильтрации сразу отсеять ненужные интерфейсы
+                is_physical = NetworkTopologyAnalyzer.is_physical_interface(interface_name)
+                is_mgmt = NetworkTopologyAnalyzer.is_mgmt_interface(interface_name, prefix in (24, 23, 22))
+                is_loopback = interface_name.lower().startswith('lo')
+                is_p2p = prefix in (31, 30)
+                if predicate is not None and not predicate(is_physical, is_mgmt, is_loopback, is_p2p):
                     continue
-                processed_networks.add(network_cidr)
-                
+
                 base_intf, subif_numbers = NetworkTopologyAnalyzer.extract_interface_number(interface_name)
-                
-                intf_data = {
-                    'interface': interface_name,
-                    'base_interface': base_intf,
-                    'subif_numbers': subif_numbers,
-                    'ip': ip,
-                    'prefix': prefix,
-                    'network_cidr': network_cidr,
-                    'description': description,
-                    'is_physical': NetworkTopologyAnalyzer.is_physical_interface(interface_name),
-                    'is_mgmt': NetworkTopologyAnalyzer.is_mgmt_interface(interface_name, prefix in (24, 23, 22)),
-                    'is_loopback': interface_name.lower().startswith('lo'),
-                    'is_p2p': prefix in (31, 30),
-                    'source': 'all_ip'
-                }
-                
-                # Фильтрация
-                if filter_type == 'physical':
-                    if not (intf_data['is_physical'] and intf_data['is_p2p'] and not intf_data['is_loopback']):
-                        continue
-                elif filter_type == 'mgmt':
-                    if not (intf_data['is_mgmt'] and not intf_data['is_loopback']):
-                        continue
-                elif filter_type == 'logical':
-                    if (intf_data['is_loopback'] or
-                            intf_data['is_mgmt'] or
-                            (intf_data['is_physical'] and intf_data['is_p2p'])):
-                        continue
-                
-                interfaces.append(intf_data)
-        
+
+                interfaces.append(IntfRec(
+                    interface=interface_name,
+                    base_interface=base_intf,
+                    subif_numbers=subif_numbers,
+                    ip=ip,
+                    prefix=prefix,
+                    network_cidr=network_cidr,
+                    description=description,
+                    is_physical=is_physical,
+                    is_mgmt=is_mgmt,
+                    is_loopback=is_loopback,
+                    is_p2p=is_p2p,
+                    flags=_name_flags(interface_name),
+                    source='all_ip'
+                ))
+
         # 2. Management interface из management_info (если ещё не добавлен)
-        if filter_type in ('all', 'mgmt'):
-            mgmt_info = device.get('management_info', {})
-            if mgmt_info.get('mgmt_interface') and mgmt_info.get('mgmt_ip'):
-                mgmt_ip = mgmt_info['mgmt_ip']
-                mgmt_mask = mgmt_info.get('mgmt_mask', '24')
-                mgmt_intf = mgmt_info['mgmt_interface']
-                
-                # Проверяем, не добавлен ли уже
-                already_added = any(
-                    intf['interface'] == mgmt_intf and intf['ip'] == mgmt_ip 
-                    for intf in interfaces
-                )
-                
-                if not already_added:
-                    # Преобразуем маску если нужно
-                    if mgmt_mask.isdigit():
-                        prefix = int(mgmt_mask)
-                    else:
-                        try:
-                            prefix = NetworkTopologyAnalyzer.netmask_to_prefix(mgmt_mask)
-                        except ValueError:
-                            prefix = 24
-                    
-                    interfaces.append({
-                        'interface': mgmt_intf,
-                        'base_interface': mgmt_intf,
-                        'subif_numbers': [],
-                        'ip': mgmt_ip,
-                        'prefix': prefix,
-                        'network_cidr': f"{mgmt_ip}/{prefix}",
-                        'is_physical': True,
-                        'is_mgmt': True,
-                        'is_loopback': False,
-                        'is_p2p': False,
-                        'source': 'management'
-                    })
-        
-        return interfaces
+        mgmt_info = device.get('management_info', {})
+        if mgmt_info.get('mgmt_interface') and mgmt_info.get('mgmt_ip'):
+            mgmt_ip = mgmt_info['mgmt_ip']
+            mgmt_mask = mgmt_info.get('mgmt_mask', '24')
+            mgmt_intf = mgmt_info['mgmt_interface']
+
+            # Проверяем, не добавлен ли уже
+            already_added = (mgmt_intf, mgmt_ip) in seen_intf_ip
+
+            if not already_added:
+                # Преобразуем маску если нужно (кэшированная функция понимает оба формата)
+                try:
+                    prefix = NetworkTopologyAnalyzer.netmask_to_prefix(mgmt_mask)
+                except ValueError:
+                    prefix = 24
+
+                interfaces.append(IntfRec(
+                    interface=mgmt_intf,
+                    base_interface=mgmt_intf,
+                    subif_numbers=[],
+                    ip=mgmt_ip,
+                    prefix=prefix,
+                    network_cidr=f"{mgmt_ip}/{prefix}",
+                    description='',
+                    is_physical=True,
+                    is_mgmt=True,
+                    is_loopback=False,
+                    is_p2p=False,
+                    flags=_name_flags(mgmt_intf),
+                    source='management'
+                ))
+
+        return NetworkTopologyAnalyzer.filter_interfaces(interfaces, filter_type)
 
     @staticmethod
-    def find_physical_links(devices_data: List[Dict[str, Any]]) -> List[List[Any]]:
+    def find_physical_links(devices_data: List[Dict[str, Any]],
+                            interfaces_map: Dict[str, List[Dict[str, Any]]] = None,
+                            device_metadata: Dict[str, Tuple[str, str]] = None) -> List[List[Any]]:
         """Выявляет физические P2P связи через /31 и /30 сети с указанием вендора и типа."""
-        # Маппинг имени → метаданные
-        device_metadata: Dict[str, Dict[str, str]] = {
-            device['device_name']: {
-                'vendor': device['vendor'],
-                'device_type': device['device_type']
-            }
-            for device in devices_data if device['device_name'] != 'unknown'
+        # Маппинг имени → метаданные (из общего прохода, если он уже сделан)
+        if device_metadata is None:
+            device_metadata = NetworkTopologyAnalyzer._build_device_metadata(devices_data)
+
+        # Сбор физических интерфейсов (из общего прохода, если он уже сделан)
+        if interfaces_map is None:
+            interfaces_map = NetworkTopologyAnalyzer._collect_interfaces(devices_data)
+        device_interfaces: Dict[str, List[Dict[str, Any]]] = {
+            device_name: NetworkTopologyAnalyzer.filter_interfaces(interfaces, 'physical')
+            for device_name, interfaces in interfaces_map.items()
         }
 
-        # Сбор физических интерфейсов
-        device_interfaces: Dict[str, List[Dict[str, Any]]] = {}
-        for device in devices_data:
-            device_name = device['device_name']
-            if device_name != 'unknown':
-                device_interfaces[device_name] = NetworkTopologyAnalyzer.extract_device_interfaces(
-                    device, filter_type='physical'
-                )
-
         # Индексация сетей
-        network_index: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        network_index: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
         for device_name, interfaces in device_interfaces.items():
             for intf in interfaces:
-                net = intf['network_cidr']
-                network_index.setdefault(net, []).append((device_name, intf))
+                network_index[intf.network_cidr].append((device_name, intf))
 
         # Формирование связей
         links = []
@@ -1684,48 +1837,51 @@ class NetworkTopologyAnalyzer:
             dev1_name, intf1 = endpoints[0]
             dev2_name, intf2 = endpoints[1]
 
-            pair_key = tuple(sorted([dev1_name, dev2_name]) + [network_cidr])
+            pair_key = ((dev1_name, dev2_name, network_cidr) if dev1_name < dev2_name
+                        else (dev2_name, dev1_name, network_cidr))
             if pair_key in processed_pairs:
                 continue
 
             processed_pairs.add(pair_key)
 
-            dev1_meta = device_metadata.get(dev1_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-            dev2_meta = device_metadata.get(dev2_name, {'vendor': 'N/A', 'device_type': 'N/A'})
+            vendor1, type1 = device_metadata.get(dev1_name, _DEFAULT_META)
+            vendor2, type2 = device_metadata.get(dev2_name, _DEFAULT_META)
 
             links.append([
-                dev1_name,
-                dev1_meta['vendor'],
-                dev1_meta['device_type'],
-                intf1['interface'],
-                intf1['ip'],
-                dev2_name,
-                dev2_meta['vendor'],
-                dev2_meta['device_type'],
-                intf2['interface'],
-                intf2['ip'],
+                dev1_name, vendor1, type1, intf1.interface, intf1.ip,
+                dev2_name, vendor2, type2, intf2.interface, intf2.ip,
                 network_cidr
             ])
 
         return links
 
     @staticmethod
-    def find_mgmt_interfaces(devices_data: List[Dict[str, Any]]) -> List[List[str]]:
+    def find_mgmt_interfaces(devices_data: List[Dict[str, Any]],
+                             interfaces_map: Dict[str, List[Dict[str, Any]]] = None,
+                             device_metadata: Dict[str, Tuple[str, str]] = None) -> List[List[str]]:
         """Извлекает управленческие интерфейсы."""
+        if interfaces_map is None:
+            interfaces_map = NetworkTopologyAnalyzer._collect_interfaces(devices_data)
+        if device_metadata is None:
+            device_metadata = NetworkTopologyAnalyzer._build_device_metadata(devices_data)
+
         mgmt_interfaces = []
         for device in devices_data:
             device_name = device['device_name']
             if device_name == 'unknown':
                 continue
-            mgmt_ifs = NetworkTopologyAnalyzer.extract_device_interfaces(device, filter_type='mgmt')
+            vendor, device_type = device_metadata.get(device_name, ('unknown', 'unknown'))
+            mgmt_ifs = NetworkTopologyAnalyzer.filter_interfaces(
+                interfaces_map.get(device_name, []), 'mgmt'
+            )
             for intf in mgmt_ifs:
                 mgmt_interfaces.append([
                     device_name,
-                    device.get('vendor', 'unknown'),  # Add vendor
-                    device.get('device_type', 'unknown'),  # Add type
-                    intf['interface'],
-                    intf['ip'],
-                    intf['network_cidr']
+                    vendor,  # Add vendor
+                    device_type,  # Add type
+                    intf.interface,
+                    intf.ip,
+                    intf.network_cidr
                 ])
 
             # Если mgmt интерфейсы не найдены, но есть routing_networks, добавляем их как mgmt
@@ -1738,180 +1894,228 @@ class NetworkTopologyAnalyzer:
                     # Разбор network=IP/mask
                     if "/" in network:
                         ip, mask = network.split("/", 1)
-                        prefix = int(mask) if mask.isdigit() else 24
+                        try:
+                            prefix = int(mask)
+                        except ValueError:
+                            prefix = 24
                     else:
                         ip = network
                         prefix = 24
 
                     # Вычисляем network_cidr
                     try:
-                        network_obj = ipaddress.IPv4Network(f"{ip}/{prefix}", strict=False)
-                        network_cidr = str(network_obj)
+                        network_cidr = _net_cidr(ip, prefix)
                     except ValueError:
                         network_cidr = f"{ip}/{prefix}"
 
                     mgmt_interfaces.append([
                         device_name,
-                        device.get('vendor', 'unknown'),
-                        device.get('device_type', 'unknown'),
+                        vendor,
+                        device_type,
                         interface,
                         ip,
                         network_cidr
                     ])
 
-        mgmt_interfaces.sort(key=lambda x: (x[5], x[0]))  # Sort by network_cidr then device_name
+        mgmt_interfaces.sort(key=itemgetter(5, 0))  # Sort by network_cidr then device_name
         return mgmt_interfaces
 
     @staticmethod
-    def find_logical_links(devices_data: List[Dict[str, Any]]) -> List[List[str]]:
+    def find_logical_links(devices_data: List[Dict[str, Any]],
+                           interfaces_map: Dict[str, List[Dict[str, Any]]] = None,
+                           device_metadata: Dict[str, Tuple[str, str]] = None) -> List[List[str]]:
         """Выявляет логические связи (сервисные сети, VXLAN, логические P2P)."""
         logical_links = []
         processed_networks: Set[str] = set()
         processed_vni_pairs: Set[Tuple[str, str, int]] = set()
 
-        # Создание маппинга имени устройства к его вендору и типу
-        device_metadata: Dict[str, Dict[str, str]] = {
-            device['device_name']: {
-                'vendor': device['vendor'],
-                'device_type': device['device_type']
-            }
-            for device in devices_data
-            if device['device_name'] != 'unknown'
-        }
+        # Маппинг имени устройства к вендору и типу (из общего прохода, если он уже сделан)
+        if device_metadata is None:
+            device_metadata = NetworkTopologyAnalyzer._build_device_metadata(devices_data)
 
-        # Сбор всех интерфейсов
-        all_interfaces: Dict[str, List[Dict[str, Any]]] = {}
-        for device in devices_data:
-            device_name = device['device_name']
-            if device_name != 'unknown':
-                all_interfaces[device_name] = NetworkTopologyAnalyzer.extract_device_interfaces(
-                    device, filter_type='all'
-                )
+        # Сбор всех интерфейсов (из общего прохода, если он уже сделан)
+        all_interfaces = (interfaces_map if interfaces_map is not None
+                          else NetworkTopologyAnalyzer._collect_interfaces(devices_data))
 
         # 1. Сервисные сети (VBDIF/Vlanif)
-        network_to_devices: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        network_to_devices: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
         for device_name, interfaces in all_interfaces.items():
             for intf in interfaces:
-                if (intf['interface'].startswith(('Vbdif', 'Vlanif')) and
-                        24 <= intf['prefix'] <= 28 and
-                        not intf['is_loopback']):
-                    net = intf['network_cidr']
-                    network_to_devices.setdefault(net, []).append((device_name, intf))
+                if (intf.flags & _F_SERVICE and
+                        24 <= intf.prefix <= 28 and
+                        not intf.is_loopback):
+                    network_to_devices[intf.network_cidr].append((device_name, intf))
+
+        # Сети с единственной стороной не образуют связей — отбрасываем сразу
+        network_to_devices = {k: v for k, v in network_to_devices.items() if len(v) >= 2}
 
         for network_cidr, endpoints in network_to_devices.items():
-            if len(endpoints) < 2 or network_cidr in processed_networks:
+            if network_cidr in processed_networks:
                 continue
             processed_networks.add(network_cidr)
-            for i in range(len(endpoints)):
-                for j in range(i + 1, len(endpoints)):
-                    dev1_name, intf1 = endpoints[i]
-                    dev2_name, intf2 = endpoints[j]
-
-                    # Получаем метаданные устройств
-                    dev1_meta = device_metadata.get(dev1_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-                    dev2_meta = device_metadata.get(dev2_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-
-                    logical_links.append([
-                        dev1_name,
-                        dev1_meta['vendor'],
-                        dev1_meta['device_type'],
-                        f"{intf1['interface']}/{intf1['ip']}",
-                        dev2_name,
-                        dev2_meta['vendor'],
-                        dev2_meta['device_type'],
-                        f"{intf2['interface']}/{intf2['ip']}",
-                        f"Service Network: {network_cidr}"
-                    ])
+            for (dev1_name, intf1), (dev2_name, intf2) in combinations(endpoints, 2):
+                logical_links.append(NetworkTopologyAnalyzer._logical_row(
+                    dev1_name, device_metadata.get(dev1_name, _DEFAULT_META), intf1,
+                    dev2_name, device_metadata.get(dev2_name, _DEFAULT_META), intf2,
+                    f"Service Network: {network_cidr}"
+                ))
 
         # 2. VXLAN overlay (подынтерфейсы с номерами VNI)
-        vni_map: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {}
+        vni_map: Dict[int, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
         for device_name, interfaces in all_interfaces.items():
             for intf in interfaces:
-                if intf['subif_numbers'] and intf['base_interface'].startswith(('100GE', '40GE', '10GE')):
-                    vni = intf['subif_numbers'][0]
+                if intf.subif_numbers and intf.flags & _F_HIGH_SPEED:
+                    vni = intf.subif_numbers[0]
                     if 1000 <= vni <= 16777215:
-                        vni_map.setdefault(vni, []).append((device_name, intf))
+                        vni_map[vni].append((device_name, intf))
+
+        vni_map = {k: v for k, v in vni_map.items() if len(v) >= 2}
 
         for vni, endpoints in vni_map.items():
-            if len(endpoints) < 2:
-                continue
-            base_intf_groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+            base_intf_groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
             for dev_name, intf in endpoints:
-                base_intf_groups.setdefault(intf['base_interface'], []).append((dev_name, intf))
+                base_intf_groups[intf.base_interface].append((dev_name, intf))
             for group_endpoints in base_intf_groups.values():
                 if len(group_endpoints) < 2:
                     continue
-                for i in range(len(group_endpoints)):
-                    for j in range(i + 1, len(group_endpoints)):
-                        dev1_name, intf1 = group_endpoints[i]
-                        dev2_name, intf2 = group_endpoints[j]
-                        pair_key = (min(dev1_name, dev2_name), max(dev1_name, dev2_name), vni)
-                        if pair_key in processed_vni_pairs:
-                            continue
-                        processed_vni_pairs.add(pair_key)
-                        # Получаем метаданные устройств
-                        dev1_meta = device_metadata.get(dev1_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-                        dev2_meta = device_metadata.get(dev2_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-
-                        logical_links.append([
-                            dev1_name,
-                            dev1_meta['vendor'],
-                            dev1_meta['device_type'],
-                            f"{intf1['interface']}/{intf1['ip']}",
-                            dev2_name,
-                            dev2_meta['vendor'],
-                            dev2_meta['device_type'],
-                            f"{intf2['interface']}/{intf2['ip']}",
-                            f"VXLAN VNI {vni} (Overlay)"
-                        ])
+                for (dev1_name, intf1), (dev2_name, intf2) in combinations(group_endpoints, 2):
+                    pair_key = ((dev1_name, dev2_name, vni) if dev1_name < dev2_name
+                                else (dev2_name, dev1_name, vni))
+                    if pair_key in processed_vni_pairs:
+                        continue
+                    processed_vni_pairs.add(pair_key)
+                    logical_links.append(NetworkTopologyAnalyzer._logical_row(
+                        dev1_name, device_metadata.get(dev1_name, _DEFAULT_META), intf1,
+                        dev2_name, device_metadata.get(dev2_name, _DEFAULT_META), intf2,
+                        f"VXLAN VNI {vni} (Overlay)"
+                    ))
 
         # 3. Логические P2P через /30
-        p2p30_networks: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        p2p30_networks: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
         for device_name, interfaces in all_interfaces.items():
             for intf in interfaces:
-                if (intf['prefix'] == 30 and
-                        not intf['is_loopback'] and
-                        not (intf['is_physical'] and intf['interface'].startswith(('100GE', '40GE')))):
-                    net = intf['network_cidr']
-                    p2p30_networks.setdefault(net, []).append((device_name, intf))
+                if (intf.prefix == 30 and
+                        not intf.is_loopback and
+                        not (intf.is_physical and intf.flags & _F_HS_P2P)):
+                    p2p30_networks[intf.network_cidr].append((device_name, intf))
+
+        # P2P-связь образуют ровно две стороны
+        p2p30_networks = {k: v for k, v in p2p30_networks.items() if len(v) == 2}
 
         for network_cidr, endpoints in p2p30_networks.items():
-            if len(endpoints) != 2 or network_cidr in processed_networks:
+            if network_cidr in processed_networks:
                 continue
             processed_networks.add(network_cidr)
             dev1_name, intf1 = endpoints[0]
             dev2_name, intf2 = endpoints[1]
-            # Получаем метаданные устройств
-            dev1_meta = device_metadata.get(dev1_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-            dev2_meta = device_metadata.get(dev2_name, {'vendor': 'N/A', 'device_type': 'N/A'})
-
-            logical_links.append([
-                dev1_name,
-                dev1_meta['vendor'],
-                dev1_meta['device_type'],
-                f"{intf1['interface']}/{intf1['ip']}",
-                dev2_name,
-                dev2_meta['vendor'],
-                dev2_meta['device_type'],
-                f"{intf2['interface']}/{intf2['ip']}",
+            logical_links.append(NetworkTopologyAnalyzer._logical_row(
+                dev1_name, device_metadata.get(dev1_name, _DEFAULT_META), intf1,
+                dev2_name, device_metadata.get(dev2_name, _DEFAULT_META), intf2,
                 f"Logical P2P: {network_cidr}"
-            ])
+            ))
 
         return logical_links
 
     @staticmethod
     def analyze_topology(devices_data: List[Dict[str, Any]]) -> Dict[str, List[List[str]]]:
         """Полный анализ сетевой топологии."""
+        # Интерфейсы и метаданные извлекаются один раз и переиспользуются всеми видами анализа
+        interfaces_map = NetworkTopologyAnalyzer._collect_interfaces(devices_data)
+        device_metadata = NetworkTopologyAnalyzer._build_device_metadata(devices_data)
         return {
-            "physical_links": NetworkTopologyAnalyzer.find_physical_links(devices_data),
-            "mgmt_networks": NetworkTopologyAnalyzer.find_mgmt_interfaces(devices_data),
-            "logical_links": NetworkTopologyAnalyzer.find_logical_links(devices_data)
+            "physical_links": NetworkTopologyAnalyzer.find_physical_links(
+                devices_data, interfaces_map, device_metadata),
+            "mgmt_networks": NetworkTopologyAnalyzer.find_mgmt_interfaces(
+                devices_data, interfaces_map, device_metadata),
+            "logical_links": NetworkTopologyAnalyzer.find_logical_links(
+                devices_data, interfaces_map, device_metadata)
         }
 
 
+# Предсобранные разделители отчётов (не пересоздаются при каждом вызове)
+_EQ80 = "=" * 80
+_EQ110 = "=" * 110
+_EQ130 = "=" * 130
+_EQ150 = "=" * 150
+_EQ160 = "=" * 160
+_DASH110 = "-" * 110
+_DASH130 = "-" * 130
+_DASH150 = "-" * 150
+_DASH160 = "-" * 160
+_BOX_TOP = "┌" + "─" * 128 + "┐\n"
+_BOX_BOT = "└" + "─" * 128 + "┘\n\n"
+
+# Предсобранные строки-шаблоны ASCII-диаграммы: разбор формат-строки
+# выполняется один раз при импорте, в цикле остаётся только подстановка
+_SPINE_ROW = "    ├── %-25s VTEP: %-15s ASN: %s\n".__mod__
+_LEAF_ROW = "    ├── %-25s VTEP: %-15s ASN: %s  VLANs: %s\n".__mod__
+_VTEP_ROW = "    ├── %-25s → %s\n".__mod__
+
+
+def _write_report_blob(output_file: str, text: str, append: bool = False) -> None:
+    """Пишет готовый отчёт одним бинарным блоком в сырой дескриптор.
+
+    Текст кодируется в UTF-8 один раз; запись идёт через os.write, минуя
+    буферы TextIOWrapper/BufferedWriter.
+    """
+    data = memoryview(text.encode('utf-8'))
+    mode = os.O_APPEND if append else os.O_TRUNC
+    fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | mode, 0o644)
+    try:
+        written = 0
+        while written < len(data):
+            written += os.write(fd, data[written:])
+    finally:
+        os.close(fd)
+
+
+def _box_title(title: str) -> str:
+    """Строка заголовка секции в рамке."""
+    return "│" + title.center(128) + "│\n"
+
+
+# Заголовки секций ASCII-диаграммы центрируются один раз при импорте модуля
+_SEC_DEVROLES = _box_title(" СПИСОК УСТРОЙСТВ ПО РОЛЯМ ")
+_SEC_BGPTOP = _box_title(" BGP ТОПОЛОГИЯ (EVPN) ")
+_SEC_VXLAN = _box_title(" VXLAN / EVPN КОНФИГУРАЦИЯ ")
+_SEC_PORTCH = _box_title(" PORT-CHANNEL (LACP) ")
+_SEC_MGMT = _box_title(" СЕТЬ УПРАВЛЕНИЯ (Management OOB) ")
+_SEC_PHYS = _box_title(" ФИЗИЧЕСКАЯ ТОПОЛОГИЯ (CLOS Architecture) ")
+_SEC_STATS = _box_title(" ИТОГОВАЯ СТАТИСТИКА ")
+
+
+def _classify_roles(results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]],
+                                                            List[Dict[str, Any]],
+                                                            List[Dict[str, Any]]]:
+    """Классифицирует устройства по ролям (spine/leaf/border) за один проход.
+
+    Имя приводится к нижнему регистру один раз на устройство; общий помощник
+    для всех генераторов отчётов, чтобы роли не пересчитывались в каждом.
+    """
+    spine, leaf, border = [], [], []
+    for r in results:
+        name = r['device_name'].lower()
+        if 'spn' in name:
+            spine.append(r)
+        elif 'brl' in name:
+            border.append(r)
+        elif 'lf' in name:
+            leaf.append(r)
+    return spine, leaf, border
+
+
 class ReportGenerator:
     """Генератор отчётов по результатам анализа."""
 
+    # Шаблоны строк таблиц (компилируются один раз вместо f-строки на каждую строку)
+    _PHYS_ROW_TMPL = "{:<25} | {:<18} | {:<16} | {:<25} | {:<18} | {:<16} | {:<20}"
+    _MGMT_ROW_TMPL = "{:<25} |  {:<18} | {:<16} | {:<20}"
+    _LOG_ROW_TMPL = "{:<25} |  {:<25} | {:<25} |  {:<25} | {:<35}"
+    _FILE_PHYS_ROW_TMPL = _PHYS_ROW_TMPL + "\n"
+    _FILE_MGMT_ROW_TMPL = "{:<25} | {:<15} | {:<15} | {:<18} | {:<16} | {:<20}\n"
+    _FILE_LOG_ROW_TMPL = ("{:<25} | {:<12} | {:<15} | {:<25} | "
+                          "{:<25} | {:<12} | {:<15} | {:<25} | {:<35}\n")
+
     @staticmethod
     def print_short_report(results: List[Dict[str, Any]]) -> None:
         """Печатает краткий отчёт в виде таблицы."""
@@ -1923,11 +2127,14 @@ class ReportGenerator:
             if len(filename) > 35:
                 filename = filename[:32] + "..."
 
+            # Повторно используемые поля читаются из словаря один раз
+            name = r["device_name"]
+            model = r["model"]
             rows.append([
                 filename,
                 r["vendor"],
-                r["device_name"] if r["device_name"] != "unknown" else "—",
-                r["model"] if r["model"] != "unknown" else "—",
+                name if name != "unknown" else "—",
+                model if model != "unknown" else "—",
                 r["device_type"],
                 str(r["total_vlans"]),
                 str(len(r["routing_networks"]))
@@ -1952,101 +2159,95 @@ class ReportGenerator:
     @staticmethod
     def print_topology_analysis(result: Dict[str, List[List[str]]]) -> None:
         """Печатает анализ топологии."""
+        out: List[str] = []
         # Физические связи
         links = result.get("physical_links", [])
-        print("\n" + "=" * 150)
-        print("🔗 ФИЗИЧЕСКИЕ СВЯЗИ (Physical P2P Links)")
-        print("=" * 150)
+        out.append("\n" + _EQ150)
+        out.append("🔗 ФИЗИЧЕСКИЕ СВЯЗИ (Physical P2P Links)")
+        out.append(_EQ150)
         if links:
-            print(f"{'Устройство 1':<25} | {'Интерфейс':<18} | {'IP':<16} | "
+            out.append(f"{'Устройство 1':<25} | {'Интерфейс':<18} | {'IP':<16} | "
                   f"{'Устройство 2':<25} | {'Интерфейс':<18} | {'IP':<16} | {'Сеть':<20}")
-            print("-" * 150)
+            out.append(_DASH150)
             for link in links:
                 dev1, vendor1, type1, intf1, ip1, dev2, vendor2, type2, intf2, ip2, net = link
-                print(f"{dev1:<25} | {intf1:<18} | {ip1:<16} | "
-                      f"{dev2:<25} | {intf2:<18} | {ip2:<16} | {net:<20}")
-            print(f"\n✅ Всего физических связей: {len(links)}")
+                out.append(ReportGenerator._PHYS_ROW_TMPL.format(
+                    dev1, intf1, ip1, dev2, intf2, ip2, net))
+            out.append(f"\n✅ Всего физических связей: {len(links)}")
         else:
-            print("⚠️  Физические связи не обнаружены")
+            out.append("⚠️  Физические связи не обнаружены")
 
         # Управленческие сети
         mgmt = result.get("mgmt_networks", [])
-        print("\n" + "=" * 110)
-        print("🖥️  УПРАВЛЕНЧЕСКИЕ ИНТЕРФЕЙСЫ (Management Networks)")
-        print("=" * 110)
+        out.append("\n" + _EQ110)
+        out.append("🖥️  УПРАВЛЕНЧЕСКИЕ ИНТЕРФЕЙСЫ (Management Networks)")
+        out.append(_EQ110)
         if mgmt:
-            print(f"{'Устройство':<25} |  {'Интерфейс':<18} | {'IP адрес':<16} | {'Сеть':<20}")
-            print("-" * 110)
+            out.append(f"{'Устройство':<25} |  {'Интерфейс':<18} | {'IP адрес':<16} | {'Сеть':<20}")
+            out.append(_DASH110)
             for entry in mgmt:
                 if len(entry) >= 6:
                     dev, vendor, dev_type, intf, ip, net = entry
-                    print(f"{dev:<25} |  {intf:<18} | {ip:<16} | {net:<20}")
+                    out.append(ReportGenerator._MGMT_ROW_TMPL.format(dev, intf, ip, net))
                 else:
                     # Fallback for backward compatibility
                     dev, intf, ip, net = entry
-                    print(f"{dev:<25} |  {intf:<18} | {ip:<16} | {net:<20}")
-            print(f"\n✅ Всего управленческих интерфейсов: {len(mgmt)}")
+                    out.append(ReportGenerator._MGMT_ROW_TMPL.format(dev, intf, ip, net))
+            out.append(f"\n✅ Всего управленческих интерфейсов: {len(mgmt)}")
 
-            networks = {}
+            networks = defaultdict(list)
             for entry in mgmt:
                 if len(entry) >= 6:
-                    net = entry[5]
-                    networks.setdefault(net, []).append(f"{entry[0]} ({entry[4]})")
+                    networks[entry[5]].append(f"{entry[0]} ({entry[4]})")
                 else:
-                    net = entry[3]
-                    networks.setdefault(net, []).append(f"{entry[0]} ({entry[2]})")
+                    networks[entry[3]].append(f"{entry[0]} ({entry[2]})")
 
-            print("\nГруппировка по сетям управления:")
+            out.append("\nГруппировка по сетям управления:")
             for net, devices in sorted(networks.items()):
-                print(f"  • {net}: {', '.join(devices)}")
+                out.append(f"  • {net}: {', '.join(devices)}")
         else:
-            print("⚠️  Управленческие интерфейсы не обнаружены")
+            out.append("⚠️  Управленческие интерфейсы не обнаружены")
 
         # Логические связи
         logical = result.get("logical_links", [])
-        print("\n" + "=" * 160)
-        print("🌐 ЛОГИЧЕСКИЕ СВЯЗИ (Logical Links: VXLAN Overlay, Service Networks)")
-        print("=" * 160)
+        out.append("\n" + _EQ160)
+        out.append("🌐 ЛОГИЧЕСКИЕ СВЯЗИ (Logical Links: VXLAN Overlay, Service Networks)")
+        out.append(_EQ160)
         if logical:
-            print(f"{'Устройство 1':<25} | {'Интерфейс/IP':<25}    | {'Устройство 2':<25} | {'Интерфейс/IP':<25}    | {'Тип связи':<35}")
-            print("-" * 160)
+            out.append(f"{'Устройство 1':<25} | {'Интерфейс/IP':<25}    | {'Устройство 2':<25} | {'Интерфейс/IP':<25}    | {'Тип связи':<35}")
+            out.append(_DASH160)
             for link in logical:
                 if len(link) >= 9:
                     dev1, vendor1, type1, intf_ip1, dev2, vendor2, type2, intf_ip2, desc = link
-                    print(f"{dev1:<25} |  {intf_ip1:<25} | {dev2:<25} |  {intf_ip2:<25} | {desc:<35}")
+                    out.append(ReportGenerator._LOG_ROW_TMPL.format(
+                        dev1, intf_ip1, dev2, intf_ip2, desc))
                 else:
                     # Fallback for backward compatibility
                     dev1, intf_ip1, dev2, intf_ip2, desc = link
-                    print(f"{dev1:<25} |  {intf_ip1:<25} | {dev2:<25} |  {intf_ip2:<25} | {desc:<35}")
-            print(f"\n✅ Всего логических связей: {len(logical)}")
-
-            # Calculate statistics considering the new structure
-            vxlan_count = 0
-            service_count = 0
-            p2p_count = 0
-            for l in logical:
-                if len(l) >= 9:
-                    desc = l[8]  # Description is at index 8 in new structure
-                else:
-                    desc = l[4]  # Description is at index 4 in old structure
-                if 'VXLAN' in desc:
-                    vxlan_count += 1
-                if 'Service Network' in desc:
-                    service_count += 1
-                if 'Logical P2P' in desc:
-                    p2p_count += 1
-
-            print("\nСтатистика логических связей:")
+                    out.append(ReportGenerator._LOG_ROW_TMPL.format(
+                        dev1, intf_ip1, dev2, intf_ip2, desc))
+            out.append(f"\n✅ Всего логических связей: {len(logical)}")
+
+            # Статистика: одно C-сканирование склеенных описаний вместо проверок по строкам
+            descs = '\n'.join(l[8] if len(l) >= 9 else l[4] for l in logical)
+            vxlan_count = descs.count('VXLAN')
+            service_count = descs.count('Service Network')
+            p2p_count = descs.count('Logical P2P')
+
+            out.append("\nСтатистика логических связей:")
             if vxlan_count:
-                print(f"  • VXLAN Overlay (VNI): {vxlan_count}")
+                out.append(f"  • VXLAN Overlay (VNI): {vxlan_count}")
             if service_count:
-                print(f"  • Сервисные сети (L3): {service_count}")
+                out.append(f"  • Сервисные сети (L3): {service_count}")
             if p2p_count:
-                print(f"  • Логические P2P (/30): {p2p_count}")
+                out.append(f"  • Логические P2P (/30): {p2p_count}")
         else:
-            print("ℹ️  Логические связи не обнаружены (требуется дополнительная информация о конфигурации тоннелей)")
+            out.append("ℹ️  Логические связи не обнаружены (требуется дополнительная информация о конфигурации тоннелей)")
+
+        out.append(_EQ130 + "\n")
 
-        print("=" * 130 + "\n")
+        # Единый вывод вместо множества вызовов print
+        print('\n'.join(out))
 
     @staticmethod
     def write_detailed_report(results: List[Dict[str, Any]],
@@ -2054,326 +2255,324 @@ class ReportGenerator:
                               links_result: Dict[str, List[List[str]]],
                               conf_dir: str) -> None:
         """Записывает подробный отчёт в файл."""
-        from datetime import datetime
-
-        with open(output_file, "w", encoding='utf-8') as f:
-            f.write(f"Анализ сетевого оборудования - {len(results)} устройств\n")
-            f.write(f"Дата: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 80 + "\n\n")
-
-            for r in results:
-                f.write(f"{'=' * 40}\n")
-                f.write(f"Устройство: {r['filename']}\n")
-                f.write(f"{'=' * 40}\n")
-                f.write(f"Vendor: {r['vendor']}\n")
-                f.write(f"Device Name: {r['device_name']}\n")
-                f.write(f"Model: {r['model']}\n")
-                f.write(f"Type: {r['device_type']}\n")
-                f.write(f"Total VLANs: {r['total_vlans']}\n")
-                f.write(
-                    f"Active VLANs: {', '.join(str(vlan) for vlan in r['active_vlans']) if r['active_vlans'] else 'None'}\n")
-                f.write(f"Routing Networks Count: {len(r['routing_networks'])}\n")
-
-                if r['routing_networks']:
-                    f.write("\nRouting Networks:\n")
-                    for i, net in enumerate(r["routing_networks"], 1):
-                        if 'interface' in net:
-                            f.write(f"  {i}. Interface: {net['interface']}, Network: {net['network']}\n")
-                        elif 'route' in net:
-                            f.write(f"  {i}. Static Route: {net['route']}\n")
-
-                f.write("\nConfiguration snippet:\n")
-                try:
-                    with open(Path(conf_dir) / r['filename'], 'r', encoding='utf-8', errors='ignore') as config_file:
-                        lines = config_file.readlines()
-                        for line in lines[:10]:
-                            f.write(f"  {line.rstrip()}\n")
-                except Exception as e:
-                    f.write(f"  ⚠️ Не удалось прочитать конфигурацию: {str(e)}\n")
-
-                # VRF информация
-                vrf_info = r.get('vrf_info', {})
-                if vrf_info and vrf_info.get('enabled') and vrf_info.get('vrfs'):
-                    f.write("\nVRF (Virtual Routing and Forwarding):\n")
-                    for vrf in vrf_info['vrfs']:
-                        f.write(f"  • VRF: {vrf['name']}\n")
-                        if vrf.get('description'):
-                            f.write(f"    Description: {vrf['description']}\n")
-
-                # OSPF информация
-                ospf_info = r.get('ospf_info', {})
-                if ospf_info and ospf_info.get('enabled'):
-                    f.write("\nOSPF Configuration:\n")
-                    f.write(f"  • Process ID: {ospf_info.get('process_id', 'N/A')}\n")
-                    if ospf_info.get('vrf'):
-                        f.write(f"  • VRF: {ospf_info['vrf']}\n")
-                    if ospf_info.get('router_id'):
-                        f.write(f"  • Router ID: {ospf_info['router_id']}\n")
-                    if ospf_info.get('areas'):
-                        f.write("  • Areas:\n")
-                        for area in ospf_info['areas']:
-                            area_id = area.get('area_id', 'N/A')
-                            auth = area.get('authentication', 'N/A')
-                            f.write(f"    - Area {area_id}: Authentication = {auth}\n")
-                    if ospf_info.get('networks'):
-                        f.write("  • Networks:\n")
-                        for net in ospf_info['networks'][:10]:  # Ограничим вывод
-                            f.write(f"    - {net['network']} → Area {net['area']}\n")
-                        if len(ospf_info['networks']) > 10:
-                            f.write(f"    ... и ещё {len(ospf_info['networks']) - 10} сетей\n")
-
-                # LLDP информация
-                lldp_info = r.get('lldp_info', {})
-                if lldp_info and lldp_info.get('enabled') and lldp_info.get('lldp_run'):
-                    f.write("\nLLDP Configuration:\n")
-                    f.write("  • LLDP: Enabled\n")
-                    if lldp_info.get('neighbors'):
-                        f.write(f"  • Neighbors: {len(lldp_info['neighbors'])} обнаружено\n")
-                        for neighbor in lldp_info['neighbors'][:10]:  # Ограничим вывод
-                            intf = neighbor.get('interface', 'N/A')
-                            desc = neighbor.get('description', 'N/A')
-                            chassis = neighbor.get('chassis_id', 'N/A')
-                            port = neighbor.get('port_id', 'N/A')
-                            f.write(f"    - {intf}: {desc}")
-                            if chassis != 'N/A' or port != 'N/A':
-                                f.write(f" (Chassis: {chassis}, Port: {port})")
-                            f.write("\n")
-                        if len(lldp_info['neighbors']) > 10:
-                            f.write(f"    ... и ещё {len(lldp_info['neighbors']) - 10} соседей\n")
-
-                # Статус интерфейсов
-                interface_status = r.get('interface_status', {})
-                if interface_status:
-                    up_count = sum(1 for s in interface_status.values() if s == 'up')
-                    down_count = sum(1 for s in interface_status.values() if s == 'down')
-                    f.write(f"\nInterface Status: {up_count} up, {down_count} down\n")
-                    # Показываем только интерфейсы в состоянии down
-                    down_interfaces = [intf for intf, status in interface_status.items() if status == 'down']
-                    if down_interfaces:
-                        f.write("  • Down interfaces:\n")
-                        for intf in down_interfaces[:10]:
-                            f.write(f"    - {intf}: DOWN\n")
-                        if len(down_interfaces) > 10:
-                            f.write(f"    ... и ещё {len(down_interfaces) - 10} интерфейсов\n")
-
-                f.write("\n")
-
-            links = links_result.get("physical_links", [])
-            if not links:
-                f.write("⚠️  Физические связи не обнаружены\n")
-            else:
-                f.write("### Таблица связей между устройствами\n")
-                f.write("\n" + "=" * 150 + "\n")
-                f.write(f"{'Устройство 1':<25} | {'Интерфейс':<18} | {'IP':<16} | "
-                        f"{'Устройство 2':<25} | {'Интерфейс':<18} | {'IP':<16} | {'Сеть':<20}\n")
-                f.write("=" * 150 + "\n")
-
-                for link in links:
-                    dev1, vendor1, type1, intf1, ip1, dev2, vendor2, type2, intf2, ip2, net = link
-                    f.write(f"{dev1:<25} | {intf1:<18} | {ip1:<16} | "
-                            f"{dev2:<25} | {intf2:<18} | {ip2:<16} | {net:<20}\n")
-
-                f.write("=" * 150 + "\n")
-                f.write(f"Всего обнаружено физических связей: {len(links)}\n")
-
-            # Управленческие сети
-            mgmt = links_result.get("mgmt_networks", [])
-            f.write("\n" + "=" * 130 + "\n")
-            f.write(" 🖥️  УПРАВЛЕНЧЕСКИЕ ИНТЕРФЕЙСЫ (Management Networks)\n")
-            f.write("=" * 130 + "\n")
-            if mgmt:
-                f.write(f"{'Устройство':<25} | {'Вендор':<15} | {'Тип':<15} | {'Интерфейс':<18} | {'IP адрес':<16} | {'Сеть':<20}\n")
-                f.write("-" * 130 + "\n")
-                for entry in mgmt:
-                    if len(entry) >= 6:
-                        dev, vendor, dev_type, intf, ip, net = entry
-                        f.write(f"{dev:<25} | {vendor:<15} | {dev_type:<15} | {intf:<18} | {ip:<16} | {net:<20}\n")
-                    else:
-                        # Fallback for backward compatibility
-                        dev, intf, ip, net = entry
-                        f.write(f"{dev:<25} | {'':<15} | {'':<15} | {intf:<18} | {ip:<16} | {net:<20}\n")
-                f.write(f"\n✅ Всего управленческих интерфейсов: {len(mgmt)}\n")
-
-                networks = {}
-                for entry in mgmt:
-                    if len(entry) >= 6:
-                        net = entry[5]
-                        networks.setdefault(net, []).append(f"{entry[0]} ({entry[4]})")
-                    else:
-                        net = entry[3]
-                        networks.setdefault(net, []).append(f"{entry[0]} ({entry[2]})")
 
-                f.write("\nГруппировка по сетям управления:\n")
-                for net, devices in sorted(networks.items()):
-                    f.write(f"  • {net}: {', '.join(devices)}\n")
-            else:
-                f.write("⚠️  Управленческие интерфейсы не обнаружены\n")
-
-            # Логические связи
-            logical = links_result.get("logical_links", [])
-            f.write("\n" + "=" * 160 + "\n")
-            f.write(" 🌐 ЛОГИЧЕСКИЕ СВЯЗИ (Logical Links: VXLAN Overlay, Service Networks)\n")
-            f.write("=" * 160 + "\n")
-            if logical:
-                f.write(f"{'Устройство 1':<25} | {'Вендор':<12} | {'Тип':<15} | {'Интерфейс/IP':<25} | {'Устройство 2':<25} | {'Вендор':<12} | {'Тип':<15} | {'Интерфейс/IP':<25} | {'Тип связи':<35}\n")
-                f.write("-" * 160 + "\n")
-                for link in logical:
-                    if len(link) >= 9:
-                        dev1, vendor1, type1, intf_ip1, dev2, vendor2, type2, intf_ip2, desc = link
-                        f.write(f"{dev1:<25} | {vendor1:<12} | {type1:<15} | {intf_ip1:<25} | {dev2:<25} | {vendor2:<12} | {type2:<15} | {intf_ip2:<25} | {desc:<35}\n")
-                    else:
-                        # Fallback for backward compatibility
-                        dev1, intf_ip1, dev2, intf_ip2, desc = link
-                        f.write(f"{dev1:<25} | {'':<12} | {'':<15} | {intf_ip1:<25} | {dev2:<25} | {'':<12} | {'':<15} | {intf_ip2:<25} | {desc:<35}\n")
-                f.write(f"\n✅ Всего логических связей: {len(logical)}\n")
-
-                # Calculate statistics considering the new structure
-                vxlan_count = 0
-                service_count = 0
-                p2p_count = 0
-                for l in logical:
-                    if len(l) >= 9:
-                        desc = l[8]  # Description is at index 8 in new structure
-                    else:
-                        desc = l[4]  # Description is at index 4 in old structure
-                    if 'VXLAN' in desc:
-                        vxlan_count += 1
-                    if 'Service Network' in desc:
-                        service_count += 1
-                    if 'Logical P2P' in desc:
-                        p2p_count += 1
-
-                f.write("\nСтатистика логических связей:\n")
-                if vxlan_count:
-                    f.write(f"  • VXLAN Overlay (VNI): {vxlan_count}\n")
-                if service_count:
-                    f.write(f"  • Сервисные сети (L3): {service_count}\n")
-                if p2p_count:
-                    f.write(f"  • Логические P2P (/30): {p2p_count}\n")
-            else:
-                f.write("ℹ️  Логические связи не обнаружены (требуется дополнительная информация о конфигурации тоннелей)\n")
+        # Отчёт собирается в память и записывается одним вызовом write
+        parts: List[str] = []
+        parts.append(f"Анализ сетевого оборудования - {len(results)} устройств\n")
+        parts.append(f"Дата: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        parts.append(_EQ80 + "\n\n")
 
-            f.write(f"\n✅ Детальная информация сохранена в файл: {output_file}\n")
+        for r in results:
+            parts.append(f"{'=' * 40}\n")
+            parts.append(f"Устройство: {r['filename']}\n")
+            parts.append(f"{'=' * 40}\n")
+            parts.append(f"Vendor: {r['vendor']}\n")
+            parts.append(f"Device Name: {r['device_name']}\n")
+            parts.append(f"Model: {r['model']}\n")
+            parts.append(f"Type: {r['device_type']}\n")
+            parts.append(f"Total VLANs: {r['total_vlans']}\n")
+            parts.append(
+                f"Active VLANs: {', '.join(str(vlan) for vlan in r['active_vlans']) if r['active_vlans'] else 'None'}\n")
+            parts.append(f"Routing Networks Count: {len(r['routing_networks'])}\n")
+
+            if r['routing_networks']:
+                parts.append("\nRouting Networks:\n")
+                for i, net in enumerate(r["routing_networks"], 1):
+                    if 'interface' in net:
+                        parts.append(f"  {i}. Interface: {net['interface']}, Network: {net['network']}\n")
+                    elif 'route' in net:
+                        parts.append(f"  {i}. Static Route: {net['route']}\n")
+
+            parts.append("\nConfiguration snippet:\n")
+            try:
+                with open(Path(conf_dir) / r['filename'], 'r', encoding='utf-8', errors='ignore') as config_file:
+                    # Читаем ровно 10 строк, не загружая весь файл
+                    for line in islice(config_file, 10):
+                        parts.append(f"  {line.rstrip()}\n")
+            except Exception as e:
+                parts.append(f"  ⚠️ Не удалось прочитать конфигурацию: {str(e)}\n")
+
+            # VRF информация
+            vrf_info = r.get('vrf_info', {})
+            if vrf_info and vrf_info.get('enabled') and vrf_info.get('vrfs'):
+                parts.append("\nVRF (Virtual Routing and Forwarding):\n")
+                for vrf in vrf_info['vrfs']:
+                    parts.append(f"  • VRF: {vrf['name']}\n")
+                    if vrf.get('description'):
+                        parts.append(f"    Description: {vrf['description']}\n")
+
+            # OSPF информация
+            ospf_info = r.get('ospf_info', {})
+            if ospf_info and ospf_info.get('enabled'):
+                parts.append("\nOSPF Configuration:\n")
+                parts.append(f"  • Process ID: {ospf_info.get('process_id', 'N/A')}\n")
+                if ospf_info.get('vrf'):
+                    parts.append(f"  • VRF: {ospf_info['vrf']}\n")
+                if ospf_info.get('router_id'):
+                    parts.append(f"  • Router ID: {ospf_info['router_id']}\n")
+                if ospf_info.get('areas'):
+                    parts.append("  • Areas:\n")
+                    for area in ospf_info['areas']:
+                        area_id = area.get('area_id', 'N/A')
+                        auth = area.get('authentication', 'N/A')
+                        parts.append(f"    - Area {area_id}: Authentication = {auth}\n")
+                if ospf_info.get('networks'):
+                    parts.append("  • Networks:\n")
+                    for net in ospf_info['networks'][:10]:  # Ограничим вывод
+                        parts.append(f"    - {net['network']} → Area {net['area']}\n")
+                    if len(ospf_info['networks']) > 10:
+                        parts.append(f"    ... и ещё {len(ospf_info['networks']) - 10} сетей\n")
+
+            # LLDP информация
+            lldp_info = r.get('lldp_info', {})
+            if lldp_info and lldp_info.get('enabled') and lldp_info.get('lldp_run'):
+                parts.append("\nLLDP Configuration:\n")
+                parts.append("  • LLDP: Enabled\n")
+                if lldp_info.get('neighbors'):
+                    parts.append(f"  • Neighbors: {len(lldp_info['neighbors'])} обнаружено\n")
+                    for neighbor in lldp_info['neighbors'][:10]:  # Ограничим вывод
+                        intf = neighbor.get('interface', 'N/A')
+                        desc = neighbor.get('description', 'N/A')
+                        chassis = neighbor.get('chassis_id', 'N/A')
+                        port = neighbor.get('port_id', 'N/A')
+                        parts.append(f"    - {intf}: {desc}")
+                        if chassis != 'N/A' or port != 'N/A':
+                            parts.append(f" (Chassis: {chassis}, Port: {port})")
+                        parts.append("\n")
+                    if len(lldp_info['neighbors']) > 10:
+                        parts.append(f"    ... и ещё {len(lldp_info['neighbors']) - 10} соседей\n")
 
-        print(f"✅ Детальная информация сохранена в файл: \033[32m{output_file}\033[0m\n\n")
+            # Статус интерфейсов
+            interface_status = r.get('interface_status', {})
+            if interface_status:
+                # Один C-проход Counter вместо двух генераторных сумм по статусам
+                status_counts = Counter(interface_status.values())
+                up_count = status_counts.get('up', 0)
+                down_count = status_counts.get('down', 0)
+                parts.append(f"\nInterface Status: {up_count} up, {down_count} down\n")
+                # Показываем только интерфейсы в состоянии down
+                down_interfaces = [intf for intf, status in interface_status.items() if status == 'down']
+                if down_interfaces:
+                    parts.append("  • Down interfaces:\n")
+                    for intf in down_interfaces[:10]:
+                        parts.append(f"    - {intf}: DOWN\n")
+                    if len(down_interfaces) > 10:
+                        parts.append(f"    ... и ещё {len(down_interfaces) - 10} интерфейсов\n")
+
+            parts.append("\n")
+
+        links = links_result.get("physical_links", [])
+        if not links:
+            parts.append("⚠️  Физические связи не обнаружены\n")
+        else:
+            parts.append("### Таблица связей между устройствами\n")
+            parts.append("\n" + _EQ150 + "\n")
+            parts.append(f"{'Устройство 1':<25} | {'Интерфейс':<18} | {'IP':<16} | "
+                    f"{'Устройство 2':<25} | {'Интерфейс':<18} | {'IP':<16} | {'Сеть':<20}\n")
+            parts.append(_EQ150 + "\n")
 
-    @staticmethod
-    def draw_topology_ascii(results: List[Dict[str, Any]], 
-                            links_result: Dict[str, List[List[str]]],
-                            output_file: str) -> None:
-        """Генерирует текстовую ASCII-диаграмму топологии и расширенную информацию."""
-        from datetime import datetime
+            for link in links:
+                dev1, vendor1, type1, intf1, ip1, dev2, vendor2, type2, intf2, ip2, net = link
+                parts.append(ReportGenerator._FILE_PHYS_ROW_TMPL.format(
+                    dev1, intf1, ip1, dev2, intf2, ip2, net))
 
-        with open(output_file, "a", encoding='utf-8') as f:
-            # Заголовок секции топологии
-            f.write("\n" + "=" * 130 + "\n")
-            f.write(" 📊 ТЕКСТОВАЯ КАРТА ТОПОЛОГИИ СЕТИ\n")
-            f.write("=" * 130 + "\n\n")
+            parts.append(_EQ150 + "\n")
+            parts.append(f"Всего обнаружено физических связей: {len(links)}\n")
 
-            # === СПИСЕК УСТРОЙСТВ ПО РОЛЯМ ===
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " СПИСОК УСТРОЙСТВ ПО РОЛЯМ ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
+        # Управленческие сети
+        mgmt = links_result.get("mgmt_networks", [])
+        parts.append("\n" + _EQ130 + "\n")
+        parts.append(" 🖥️  УПРАВЛЕНЧЕСКИЕ ИНТЕРФЕЙСЫ (Management Networks)\n")
+        parts.append(_EQ130 + "\n")
+        if mgmt:
+            parts.append(f"{'Устройство':<25} | {'Вендор':<15} | {'Тип':<15} | {'Интерфейс':<18} | {'IP адрес':<16} | {'Сеть':<20}\n")
+            parts.append(_DASH130 + "\n")
+            for entry in mgmt:
+                if len(entry) >= 6:
+                    dev, vendor, dev_type, intf, ip, net = entry
+                    parts.append(ReportGenerator._FILE_MGMT_ROW_TMPL.format(
+                        dev, vendor, dev_type, intf, ip, net))
+                else:
+                    # Fallback for backward compatibility
+                    dev, intf, ip, net = entry
+                    parts.append(ReportGenerator._FILE_MGMT_ROW_TMPL.format(
+                        dev, '', '', intf, ip, net))
+            parts.append(f"\n✅ Всего управленческих интерфейсов: {len(mgmt)}\n")
 
-            spine_devices = [r for r in results if 'spn' in r['device_name'].lower()]
-            leaf_devices = [r for r in results if 'lf' in r['device_name'].lower() and 'brl' not in r['device_name'].lower()]
-            border_devices = [r for r in results if 'brl' in r['device_name'].lower()]
+            networks = {}
+            for entry in mgmt:
+                if len(entry) >= 6:
+                    net = entry[5]
+                    networks.setdefault(net, []).append(f"{entry[0]} ({entry[4]})")
+                else:
+                    net = entry[3]
+                    networks.setdefault(net, []).append(f"{entry[0]} ({entry[2]})")
 
-            f.write("  Spine (Ядро):\n")
-            for dev in spine_devices:
-                vxlan_ip = dev.get('vxlan_info', {}).get('vtep_ip', 'N/A')
-                bgp_asn = dev.get('bgp_info', {}).get('asn', 'N/A')
-                f.write(f"    ├── {dev['device_name']:<25} VTEP: {vxlan_ip:<15} ASN: {bgp_asn}\n")
-            f.write("\n")
+            parts.append("\nГруппировка по сетям управления:\n")
+            for net, devices in sorted(networks.items()):
+                parts.append(f"  • {net}: {', '.join(devices)}\n")
+        else:
+            parts.append("⚠️  Управленческие интерфейсы не обнаружены\n")
 
-            f.write("  Leaf (Доступ):\n")
-            for dev in leaf_devices:
-                vxlan_ip = dev.get('vxlan_info', {}).get('vtep_ip', 'N/A')
-                bgp_asn = dev.get('bgp_info', {}).get('asn', 'N/A')
-                vlan_count = dev.get('total_vlans', 0)
-                f.write(f"    ├── {dev['device_name']:<25} VTEP: {vxlan_ip:<15} ASN: {bgp_asn}  VLANs: {vlan_count}\n")
-            f.write("\n")
+        # Логические связи
+        logical = links_result.get("logical_links", [])
+        parts.append("\n" + _EQ160 + "\n")
+        parts.append(" 🌐 ЛОГИЧЕСКИЕ СВЯЗИ (Logical Links: VXLAN Overlay, Service Networks)\n")
+        parts.append(_EQ160 + "\n")
+        if logical:
+            parts.append(f"{'Устройство 1':<25} | {'Вендор':<12} | {'Тип':<15} | {'Интерфейс/IP':<25} | {'Устройство 2':<25} | {'Вендор':<12} | {'Тип':<15} | {'Интерфейс/IP':<25} | {'Тип связи':<35}\n")
+            parts.append(_DASH160 + "\n")
+            vxlan_count = service_count = p2p_count = 0
+            for link in logical:
+                if len(link) >= 9:
+                    dev1, vendor1, type1, intf_ip1, dev2, vendor2, type2, intf_ip2, desc = link
+                    parts.append(ReportGenerator._FILE_LOG_ROW_TMPL.format(
+                        dev1, vendor1, type1, intf_ip1, dev2, vendor2, type2, intf_ip2, desc))
+                else:
+                    # Fallback for backward compatibility
+                    dev1, intf_ip1, dev2, intf_ip2, desc = link
+                    parts.append(ReportGenerator._FILE_LOG_ROW_TMPL.format(
+                        dev1, '', '', intf_ip1, dev2, '', '', intf_ip2, desc))
 
-            f.write("  Border Leaf (Граница):\n")
-            for dev in border_devices:
-                vxlan_ip = dev.get('vxlan_info', {}).get('vtep_ip', 'N/A')
-                bgp_asn = dev.get('bgp_info', {}).get('asn', 'N/A')
-                vlan_count = dev.get('total_vlans', 0)
-                f.write(f"    ├── {dev['device_name']:<25} VTEP: {vxlan_ip:<15} ASN: {bgp_asn}  VLANs: {vlan_count}\n")
-            f.write("\n")
+                # Статистика считается в том же проходе, desc уже распакован
+                vxlan_count += 'VXLAN' in desc
+                service_count += 'Service Network' in desc
+                p2p_count += 'Logical P2P' in desc
+            parts.append(f"\n✅ Всего логических связей: {len(logical)}\n")
+
+            parts.append("\nСтатистика логических связей:\n")
+            if vxlan_count:
+                parts.append(f"  • VXLAN Overlay (VNI): {vxlan_count}\n")
+            if service_count:
+                parts.append(f"  • Сервисные сети (L3): {service_count}\n")
+            if p2p_count:
+                parts.append(f"  • Логические P2P (/30): {p2p_count}\n")
+        else:
+            parts.append("ℹ️  Логические связи не обнаружены (требуется дополнительная информация о конфигурации тоннелей)\n")
+
+        parts.append(f"\n✅ Детальная информация сохранена в файл: {output_file}\n")
+
+        _write_report_blob(output_file, ''.join(parts))
+
+        print(f"✅ Детальная информация сохранена в файл: \033[32m{output_file}\033[0m\n\n")
+
+    @staticmethod
+    def draw_topology_ascii(results: List[Dict[str, Any]], 
+                            links_result: Dict[str, List[List[str]]],
+                            output_file: str) -> None:
+        """Генерирует текстовую ASCII-диаграмму топологии и расширенную информацию."""
 
-            # === BGP ТОПОЛОГИЯ ===
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " BGP ТОПОЛОГИЯ (EVPN) ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
+        # Строки отчёта собираются в список и склеиваются одним join
+        parts: List[str] = []
+        # Заголовок секции топологии
+        parts.append("\n" + _EQ130 + "\n")
+        parts.append(" 📊 ТЕКСТОВАЯ КАРТА ТОПОЛОГИИ СЕТИ\n")
+        parts.append(_EQ130 + "\n\n")
+
+        # === СПИСЕК УСТРОЙСТВ ПО РОЛЯМ ===
+        parts.append(_BOX_TOP)
+        parts.append(_SEC_DEVROLES)
+        parts.append(_BOX_BOT)
+
+        spine_devices, leaf_devices, border_devices = _classify_roles(results)
+
+        parts.append("  Spine (Ядро):\n")
+        for dev in spine_devices:
+            # Словари bgp_info/vxlan_info извлекаются один раз на устройство
+            vxlan_ip = (dev.get('vxlan_info') or {}).get('vtep_ip', 'N/A')
+            bgp_asn = (dev.get('bgp_info') or {}).get('asn', 'N/A')
+            parts.append(_SPINE_ROW((dev['device_name'], vxlan_ip, bgp_asn)))
+        parts.append("\n")
+
+        parts.append("  Leaf (Доступ):\n")
+        for dev in leaf_devices:
+            vxlan_ip = (dev.get('vxlan_info') or {}).get('vtep_ip', 'N/A')
+            bgp_asn = (dev.get('bgp_info') or {}).get('asn', 'N/A')
+            vlan_count = dev.get('total_vlans', 0)
+            parts.append(_LEAF_ROW((dev['device_name'], vxlan_ip, bgp_asn, vlan_count)))
+        parts.append("\n")
+
+        parts.append("  Border Leaf (Граница):\n")
+        for dev in border_devices:
+            vxlan_ip = (dev.get('vxlan_info') or {}).get('vtep_ip', 'N/A')
+            bgp_asn = (dev.get('bgp_info') or {}).get('asn', 'N/A')
+            vlan_count = dev.get('total_vlans', 0)
+            parts.append(_LEAF_ROW((dev['device_name'], vxlan_ip, bgp_asn, vlan_count)))
+        parts.append("\n")
+
+        # === BGP ТОПОЛОГИЯ ===
+        if any((d.get('bgp_info') or {}).get('enabled') for d in results):
+            parts.append(_BOX_TOP)
+            parts.append(_SEC_BGPTOP)
+            parts.append(_BOX_BOT)
 
             # ASCII схема BGP
-            f.write("                          ASN 65100 (Spine)\n")
-            f.write("              ┌────────────┬────────────┬────────────┐\n")
+            parts.append("                          ASN 65100 (Spine)\n")
+            parts.append("              ┌────────────┬────────────┬────────────┐\n")
             for dev in spine_devices:
                 bgp_info = dev.get('bgp_info', {})
                 router_id = bgp_info.get('router_id', 'N/A')
-                f.write(f"          {dev['device_name']:<18} (RID: {router_id})\n")
-            f.write("              │            │            │\n")
-            f.write("     ─────────┴────────────┴────────────┴─────────\n")
-            f.write("     │              │                  │         │\n")
-            
+                parts.append(f"          {dev['device_name']:<18} (RID: {router_id})\n")
+            parts.append("              │            │            │\n")
+            parts.append("     ─────────┴────────────┴────────────┴─────────\n")
+            parts.append("     │              │                  │         │\n")
+        
             for dev in leaf_devices:
                 bgp_info = dev.get('bgp_info', {})
                 asn = bgp_info.get('asn', 'N/A')
-                f.write(f"  ASN {asn:<5}         ASN {asn:<5}\n")
-                f.write(f"  {dev['device_name']:<18}\n")
-            
+                parts.append(f"  ASN {asn:<5}         ASN {asn:<5}\n")
+                parts.append(f"  {dev['device_name']:<18}\n")
+        
             for dev in border_devices:
                 bgp_info = dev.get('bgp_info', {})
                 asn = bgp_info.get('asn', 'N/A')
-                f.write(f"          ASN {asn:<5}         ASN {asn:<5}\n")
-                f.write(f"          {dev['device_name']:<18}\n")
-            f.write("\n")
+                parts.append(f"          ASN {asn:<5}         ASN {asn:<5}\n")
+                parts.append(f"          {dev['device_name']:<18}\n")
+            parts.append("\n")
 
             # Детали BGP сессий
-            f.write("  BGP Соседи:\n")
+            parts.append("  BGP Соседи:\n")
             for dev in results:
-                bgp_info = dev.get('bgp_info', {})
+                bgp_info = dev.get('bgp_info') or {}
                 if bgp_info.get('enabled'):
-                    f.write(f"\n    {dev['device_name']} (ASN {bgp_info.get('asn', 'N/A')}):\n")
-                    neighbors = bgp_info.get('neighbors', [])[:5]  # Первые 5 соседей
-                    for n in neighbors:
+                    parts.append(f"\n    {dev['device_name']} (ASN {bgp_info.get('asn', 'N/A')}):\n")
+                    # Список соседей извлекается один раз: срез, вывод и подсчёт используют его же
+                    all_neighbors = bgp_info.get('neighbors') or []
+                    for n in all_neighbors[:5]:  # Первые 5 соседей
                         evpn_status = "✓ EVPN" if n.get('evpn_enabled') else ""
-                        f.write(f"      ├── {n['ip']:<15} → AS {n['remote_as']:<6} {n.get('description', ''):<20} {evpn_status}\n")
-                    if len(bgp_info.get('neighbors', [])) > 5:
-                        f.write(f"      ... и ещё {len(bgp_info.get('neighbors', [])) - 5} соседей\n")
-            f.write("\n")
-
-            # === VXLAN ИНФОРМАЦИЯ ===
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " VXLAN / EVPN КОНФИГУРАЦИЯ ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
-
-            f.write("  VTEP IP адреса:\n")
+                        parts.append(f"      ├── {n['ip']:<15} → AS {n['remote_as']:<6} {n.get('description', ''):<20} {evpn_status}\n")
+                    if len(all_neighbors) > 5:
+                        parts.append(f"      ... и ещё {len(all_neighbors) - 5} соседей\n")
+            parts.append("\n")
+
+        # === VXLAN ИНФОРМАЦИЯ ===
+        if any((d.get('vxlan_info') or {}).get('enabled') for d in results):
+            parts.append(_BOX_TOP)
+            parts.append(_SEC_VXLAN)
+            parts.append(_BOX_BOT)
+
+            parts.append("  VTEP IP адреса:\n")
             for dev in results:
                 vxlan_info = dev.get('vxlan_info', {})
                 if vxlan_info.get('enabled'):
-                    f.write(f"    ├── {dev['device_name']:<25} → {vxlan_info.get('vtep_ip', 'N/A')}\n")
-            f.write("\n")
+                    parts.append(_VTEP_ROW((dev['device_name'], vxlan_info.get('vtep_ip', 'N/A'))))
+            parts.append("\n")
 
-            anycast_mac = None
-            for dev in results:
-                vxlan_info = dev.get('vxlan_info', {})
-                if vxlan_info.get('anycast_mac'):
-                    anycast_mac = vxlan_info['anycast_mac']
-                    break
+            # Первое устройство с anycast_mac: next() останавливается на первом совпадении
+            anycast_mac = next(
+                (mac for dev in results if (mac := (dev.get('vxlan_info') or {}).get('anycast_mac'))),
+                None)
             if anycast_mac:
-                f.write(f"  Anycast Gateway MAC: {anycast_mac}\n\n")
+                parts.append(f"  Anycast Gateway MAC: {anycast_mac}\n\n")
 
             # VNI список - все устройства
-            f.write("  VNI (VXLAN Network Identifier):\n")
+            parts.append("  VNI (VXLAN Network Identifier):\n")
             # Ширина колонок: VNI=12, Bridge VLAN=13, VNI Name=12, Device=25
             col1, col2, col3, col4 = 12, 13, 12, 25
-            f.write("    ┌" + "─" * col1 + "┬" + "─" * col2 + "┬" + "─" * col3 + "┬" + "─" * col4 + "┐\n")
-            f.write("    │" + "VNI".center(col1) + "│" + "Bridge VLAN".center(col2) + "│" + "VNI Name".center(col3) + "│" + "Device".center(col4) + "│\n")
-            f.write("    ├" + "─" * col1 + "┼" + "─" * col2 + "┼" + "─" * col3 + "┼" + "─" * col4 + "┤\n")
-            
+            parts.append("    ┌" + "─" * col1 + "┬" + "─" * col2 + "┬" + "─" * col3 + "┬" + "─" * col4 + "┐\n")
+            parts.append("    │" + "VNI".center(col1) + "│" + "Bridge VLAN".center(col2) + "│" + "VNI Name".center(col3) + "│" + "Device".center(col4) + "│\n")
+            parts.append("    ├" + "─" * col1 + "┼" + "─" * col2 + "┼" + "─" * col3 + "┼" + "─" * col4 + "┤\n")
+        
             vni_count = 0
             for dev in results:
                 vxlan_info = dev.get('vxlan_info', {})
@@ -2384,24 +2583,24 @@ class ReportGenerator:
                     bridge_vlan = str(vni.get('bridge_vlan', 'N/A'))[:col2]
                     vni_name = str(vni.get('name', 'N/A'))[:col3]
                     dev_name = device_name[:col4]
-                    f.write(f"    │{vni_id:^{col1}}│{bridge_vlan:^{col2}}│{vni_name:^{col3}}│{dev_name:^{col4}}│\n")
+                    parts.append(f"    │{vni_id:^{col1}}│{bridge_vlan:^{col2}}│{vni_name:^{col3}}│{dev_name:^{col4}}│\n")
                     vni_count += 1
-            
+        
             if vni_count == 0:
                 total_width = col1 + col2 + col3 + col4 + 5  # +5 для рамок ┌┬┬┬┐
-                f.write("    │" + "Нет данных".center(total_width) + "│\n")
-            f.write("    └" + "─" * col1 + "┴" + "─" * col2 + "┴" + "─" * col3 + "┴" + "─" * col4 + "┘\n")
-            f.write(f"\n    Всего VNI: {vni_count}\n")
-            f.write("\n")
+                parts.append("    │" + "Нет данных".center(total_width) + "│\n")
+            parts.append("    └" + "─" * col1 + "┴" + "─" * col2 + "┴" + "─" * col3 + "┴" + "─" * col4 + "┘\n")
+            parts.append(f"\n    Всего VNI: {vni_count}\n")
+            parts.append("\n")
 
             # MAC VRF (EVPN Route Targets) - все устройства
-            f.write("  MAC VRF (EVPN Route Targets):\n")
+            parts.append("  MAC VRF (EVPN Route Targets):\n")
             # Ширина колонок: VRF Name=12, RD=14, Route Target=16, Desc=12, Device=25
             col1, col2, col3, col4, col5 = 12, 14, 16, 12, 25
-            f.write("    ┌" + "─" * col1 + "┬" + "─" * col2 + "┬" + "─" * col3 + "┬" + "─" * col4 + "┬" + "─" * col5 + "┐\n")
-            f.write("    │" + "VRF Name".center(col1) + "│" + "RD".center(col2) + "│" + "Route Target".center(col3) + "│" + "Desc".center(col4) + "│" + "Device".center(col5) + "│\n")
-            f.write("    ├" + "─" * col1 + "┼" + "─" * col2 + "┼" + "─" * col3 + "┼" + "─" * col4 + "┼" + "─" * col5 + "┤\n")
-            
+            parts.append("    ┌" + "─" * col1 + "┬" + "─" * col2 + "┬" + "─" * col3 + "┬" + "─" * col4 + "┬" + "─" * col5 + "┐\n")
+            parts.append("    │" + "VRF Name".center(col1) + "│" + "RD".center(col2) + "│" + "Route Target".center(col3) + "│" + "Desc".center(col4) + "│" + "Device".center(col5) + "│\n")
+            parts.append("    ├" + "─" * col1 + "┼" + "─" * col2 + "┼" + "─" * col3 + "┼" + "─" * col4 + "┼" + "─" * col5 + "┤\n")
+        
             mac_vrf_count = 0
             for dev in results:
                 vxlan_info = dev.get('vxlan_info', {})
@@ -2413,37 +2612,40 @@ class ReportGenerator:
                     rt = str(vrf.get('route_target', 'N/A'))[:col3]
                     desc = str(vrf.get('description', 'N/A'))[:col4]
                     dev_name = device_name[:col5]
-                    f.write(f"    │{name:^{col1}}│{rd:^{col2}}│{rt:^{col3}}│{desc:^{col4}}│{dev_name:^{col5}}│\n")
+                    parts.append(f"    │{name:^{col1}}│{rd:^{col2}}│{rt:^{col3}}│{desc:^{col4}}│{dev_name:^{col5}}│\n")
                     mac_vrf_count += 1
-            
+        
             if mac_vrf_count == 0:
                 total_width = col1 + col2 + col3 + col4 + col5 + 7  # +7 для рамок ┌┬┬┬┬┐
-                f.write("    │" + "Нет данных".center(total_width) + "│\n")
-            f.write("    └" + "─" * col1 + "┴" + "─" * col2 + "┴" + "─" * col3 + "┴" + "─" * col4 + "┴" + "─" * col5 + "┘\n")
-            f.write(f"\n    Всего MAC VRF: {mac_vrf_count}\n")
-            f.write("\n")
+                parts.append("    │" + "Нет данных".center(total_width) + "│\n")
+            parts.append("    └" + "─" * col1 + "┴" + "─" * col2 + "┴" + "─" * col3 + "┴" + "─" * col4 + "┴" + "─" * col5 + "┘\n")
+            parts.append(f"\n    Всего MAC VRF: {mac_vrf_count}\n")
+            parts.append("\n")
 
-            # === PORT-CHANNEL (LACP) ===
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " PORT-CHANNEL (LACP) ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
+        # === PORT-CHANNEL (LACP) ===
+        if any(d.get('port_channels') for d in results):
+            parts.append(_BOX_TOP)
+            parts.append(_SEC_PORTCH)
+            parts.append(_BOX_BOT)
 
             for dev in results:
                 port_channels = dev.get('port_channels', [])
                 if port_channels:
-                    f.write(f"  {dev['device_name']}:\n")
+                    parts.append(f"  {dev['device_name']}:\n")
                     for pc in port_channels:
                         status = "▼ DOWN" if pc.get('shutdown') else "▲ UP"
-                        members = ", ".join([f"grp{m['group']}({m['mode']})" for m in pc.get('members', [])])
-                        f.write(f"    ├── {pc['name']:<10} {pc.get('description', ''):<35} VLANs: {pc.get('vlans', 'N/A'):<20} {status}\n")
+                        pc_members = pc.get('members') or ()
+                        members = ", ".join(f"grp{m['group']}({m['mode']})" for m in pc_members)
+                        parts.append(f"    ├── {pc['name']:<10} {pc.get('description', ''):<35} VLANs: {pc.get('vlans', 'N/A'):<20} {status}\n")
                         if members:
-                            f.write(f"    │            Members: {members}\n")
-            f.write("\n")
+                            parts.append(f"    │            Members: {members}\n")
+            parts.append("\n")
 
-            # === СЕТЬ УПРАВЛЕНИЯ ===
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " СЕТЬ УПРАВЛЕНИЯ (Management OOB) ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
+        # === СЕТЬ УПРАВЛЕНИЯ ===
+        if any((d.get('management_info') or {}).get('mgmt_ip') for d in results):
+            parts.append(_BOX_TOP)
+            parts.append(_SEC_MGMT)
+            parts.append(_BOX_BOT)
 
             mgmt_network = None
             for dev in results:
@@ -2451,104 +2653,107 @@ class ReportGenerator:
                 if mgmt_info.get('mgmt_ip'):
                     if not mgmt_network:
                         mgmt_network = f"10.7.8.0/{mgmt_info.get('mgmt_mask', '24')}"
-                    f.write(f"    ├── {dev['device_name']:<25} → {mgmt_info.get('mgmt_interface', 'eth0')}: "
+                    parts.append(f"    ├── {dev['device_name']:<25} → {mgmt_info.get('mgmt_interface', 'eth0')}: "
                            f"{mgmt_info.get('mgmt_ip')}/{mgmt_info.get('mgmt_mask', '24')} "
                            f"(GW: {mgmt_info.get('default_gateway', 'N/A')})\n")
             if mgmt_network:
-                f.write(f"\n  Management Network: {mgmt_network}\n")
-            f.write("\n")
-
-            # === ASCII СХЕМА ТОПОЛОГИИ ===
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " ФИЗИЧЕСКАЯ ТОПОЛОГИЯ (CLOS Architecture) ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
-
-            # Рисуем схему CLOS
-            f.write("                              ╔════════════════════════════════════════╗\n")
-            f.write("                              ║         SPINE LAYER (ASN 65100)        ║\n")
-            f.write("                              ╚════════════════════════════════════════╝\n")
-            f.write("                                       │        │        │\n")
-            
-            # Spine устройства
-            spine_names = [d['device_name'] for d in spine_devices]
-            f.write(f"                              {'  '.join([f'{s:<15}' for s in spine_names])}\n")
-            f.write(f"                              {'  '.join(['│' * len(spine_names)])}\n")
-            
-            # Листья
-            f.write("\n")
-            f.write("    ╔════════════════════════════════════════════════════════════════════════════╗\n")
-            f.write("    ║                    LEAF LAYER (Доступ/Граница)                             ║\n")
-            f.write("    ╚════════════════════════════════════════════════════════════════════════════╝\n")
-            
-            all_leaf = leaf_devices + border_devices
-            for dev in all_leaf:
-                bgp_info = dev.get('bgp_info', {})
-                vxlan_info = dev.get('vxlan_info', {})
-                f.write(f"\n      {dev['device_name']:<20} ASN:{bgp_info.get('asn', 'N/A'):<6} VTEP:{vxlan_info.get('vtep_ip', 'N/A'):<15}\n")
-                f.write(f"         │\\\n         ├─────────── подключено ко всем Spine (ECMP)\n         │/\n")
-            
-            f.write("\n")
-            f.write("  Условные обозначения:\n")
-            f.write("    ├── VTEP: VXLAN Tunnel End Point IP\n")
-            f.write("    ├── ASN:  BGP Autonomous System Number\n")
-            f.write("    ├── ECMP: Equal-Cost Multi-Path routing\n")
-            f.write("    └── EVPN: Ethernet VPN (BGP control plane)\n")
-            f.write("\n")
-
-            # Итоговая статистика
-            f.write("┌" + "─" * 128 + "┐\n")
-            f.write("│" + " ИТОГОВАЯ СТАТИСТИКА ".center(128) + "│\n")
-            f.write("└" + "─" * 128 + "┘\n\n")
-
-            total_devices = len(results)
-            total_spine = len(spine_devices)
-            total_leaf = len(leaf_devices)
-            total_border = len(border_devices)
-            total_vlans = sum(r.get('total_vlans', 0) for r in results)
-            total_vnis = sum(len(r.get('vxlan_info', {}).get('vnis', [])) for r in results)
-            total_port_channels = sum(len(r.get('port_channels', [])) for r in results)
-            total_bgp_sessions = sum(len(r.get('bgp_info', {}).get('neighbors', [])) for r in results)
-            
-            # LLDP статистика
-            total_lldp_neighbors = sum(len(r.get('lldp_info', {}).get('neighbors', [])) for r in results)
-            lldp_enabled_devices = sum(1 for r in results if r.get('lldp_info', {}).get('lldp_run'))
-            
-            # Статус интерфейсов
-            total_interfaces_up = sum(
-                sum(1 for s in r.get('interface_status', {}).values() if s == 'up')
-                for r in results
-            )
-            total_interfaces_down = sum(
-                sum(1 for s in r.get('interface_status', {}).values() if s == 'down')
-                for r in results
-            )
+                parts.append(f"\n  Management Network: {mgmt_network}\n")
+            parts.append("\n")
+
+        # === ASCII СХЕМА ТОПОЛОГИИ ===
+        parts.append(_BOX_TOP)
+        parts.append(_SEC_PHYS)
+        parts.append(_BOX_BOT)
+
+        # Рисуем схему CLOS
+        parts.append("                              ╔════════════════════════════════════════╗\n")
+        parts.append("                              ║         SPINE LAYER (ASN 65100)        ║\n")
+        parts.append("                              ╚════════════════════════════════════════╝\n")
+        parts.append("                                       │        │        │\n")
+        
+        # Spine устройства
+        spine_names = [d['device_name'] for d in spine_devices]
+        parts.append(f"                              {'  '.join([f'{s:<15}' for s in spine_names])}\n")
+        parts.append(f"                              {'  '.join(['│' * len(spine_names)])}\n")
+        
+        # Листья
+        parts.append("\n")
+        parts.append("    ╔════════════════════════════════════════════════════════════════════════════╗\n")
+        parts.append("    ║                    LEAF LAYER (Доступ/Граница)                             ║\n")
+        parts.append("    ╚════════════════════════════════════════════════════════════════════════════╝\n")
+        
+        all_leaf = leaf_devices + border_devices
+        for dev in all_leaf:
+            bgp_info = dev.get('bgp_info') or {}
+            vxlan_info = dev.get('vxlan_info') or {}
+            # Весь блок устройства записывается одной многострочной строкой
+            parts.append(
+                f"\n      {dev['device_name']:<20} ASN:{bgp_info.get('asn', 'N/A'):<6} VTEP:{vxlan_info.get('vtep_ip', 'N/A'):<15}\n"
+                "         │\\\n         ├─────────── подключено ко всем Spine (ECMP)\n         │/\n")
+        
+        parts.append("\n")
+        parts.append("  Условные обозначения:\n")
+        parts.append("    ├── VTEP: VXLAN Tunnel End Point IP\n")
+        parts.append("    ├── ASN:  BGP Autonomous System Number\n")
+        parts.append("    ├── ECMP: Equal-Cost Multi-Path routing\n")
+        parts.append("    └── EVPN: Ethernet VPN (BGP control plane)\n")
+        parts.append("\n")
+
+        # Итоговая статистика
+        parts.append(_BOX_TOP)
+        parts.append(_SEC_STATS)
+        parts.append(_BOX_BOT)
+
+        total_devices = len(results)
+        total_spine = len(spine_devices)
+        total_leaf = len(leaf_devices)
+        total_border = len(border_devices)
+        # Все счётчики (VLAN/VNI/PC/BGP/LLDP/интерфейсы) набираются за один проход по results
+        total_vlans = total_vnis = total_port_channels = total_bgp_sessions = 0
+        total_lldp_neighbors = lldp_enabled_devices = 0
+        total_interfaces_up = total_interfaces_down = 0
+        for r in results:
+            total_vlans += r.get('total_vlans', 0)
+            total_vnis += len((r.get('vxlan_info') or {}).get('vnis') or ())
+            total_port_channels += len(r.get('port_channels') or ())
+            total_bgp_sessions += len((r.get('bgp_info') or {}).get('neighbors') or ())
+            lldp_info = r.get('lldp_info') or {}
+            total_lldp_neighbors += len(lldp_info.get('neighbors') or ())
+            lldp_enabled_devices += bool(lldp_info.get('lldp_run'))
+            for s in (r.get('interface_status') or {}).values():
+                if s == 'up':
+                    total_interfaces_up += 1
+                elif s == 'down':
+                    total_interfaces_down += 1
+
+        parts.append(f"    Общее количество устройств:     {total_devices}\n")
+        parts.append(f"      ├── Spine:                    {total_spine}\n")
+        parts.append(f"      ├── Leaf:                     {total_leaf}\n")
+        parts.append(f"      └── Border Leaf:              {total_border}\n")
+        parts.append(f"\n")
+        parts.append(f"    VLAN (всего):                   {total_vlans}\n")
+        parts.append(f"    VXLAN VNI (всего):              {total_vnis}\n")
+        parts.append(f"    Port-Channel интерфейсов:       {total_port_channels}\n")
+        parts.append(f"    BGP сессий (всего):             {total_bgp_sessions}\n")
+        parts.append(f"    LLDP соседей (всего):           {total_lldp_neighbors} (на {lldp_enabled_devices} устройствах)\n")
+        parts.append(f"    Интерфейсов:                    {total_interfaces_up} up, {total_interfaces_down} down\n")
+        parts.append(f"\n")
+
+        # Физические связи из links_result
+        physical_links = links_result.get("physical_links", [])
+        if physical_links:
+            parts.append(f"    Физических связей (P2P /31):    {len(physical_links)}\n")
+        
+        mgmt_networks = links_result.get("mgmt_networks", [])
+        if mgmt_networks:
+            parts.append(f"    Управленческих интерфейсов:   {len(mgmt_networks)}\n")
+        
+        logical_links = links_result.get("logical_links", [])
+        if logical_links:
+            parts.append(f"    Логических связей (Overlay):  {len(logical_links)}\n")
+        
+        parts.append("\n" + _EQ130 + "\n")
+        parts.append(f" Дата генерации отчёта: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        parts.append(_EQ130 + "\n")
 
-            f.write(f"    Общее количество устройств:     {total_devices}\n")
-            f.write(f"      ├── Spine:                    {total_spine}\n")
-            f.write(f"      ├── Leaf:                     {total_leaf}\n")
-            f.write(f"      └── Border Leaf:              {total_border}\n")
-            f.write(f"\n")
-            f.write(f"    VLAN (всего):                   {total_vlans}\n")
-            f.write(f"    VXLAN VNI (всего):              {total_vnis}\n")
-            f.write(f"    Port-Channel интерфейсов:       {total_port_channels}\n")
-            f.write(f"    BGP сессий (всего):             {total_bgp_sessions}\n")
-            f.write(f"    LLDP соседей (всего):           {total_lldp_neighbors} (на {lldp_enabled_devices} устройствах)\n")
-            f.write(f"    Интерфейсов:                    {total_interfaces_up} up, {total_interfaces_down} down\n")
-            f.write(f"\n")
-
-            # Физические связи из links_result
-            physical_links = links_result.get("physical_links", [])
-            if physical_links:
-                f.write(f"    Физических связей (P2P /31):    {len(physical_links)}\n")
-            
-            mgmt_networks = links_result.get("mgmt_networks", [])
-            if mgmt_networks:
-                f.write(f"    Управленческих интерфейсов:   {len(mgmt_networks)}\n")
-            
-            logical_links = links_result.get("logical_links", [])
-            if logical_links:
-                f.write(f"    Логических связей (Overlay):  {len(logical_links)}\n")
-            
-            f.write("\n" + "=" * 130 + "\n")
-            f.write(f" Дата генерации отчёта: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 130 + "\n")
\ No newline at end of file
+        _write_report_blob(output_file, ''.join(parts), append=True)
\ No newline at end of file
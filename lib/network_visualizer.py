@@ -1,18 +1,93 @@
 """
 Модуль визуализации сетевой топологии для draw.io
 """
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, NamedTuple
 from N2G import  drawio_diagram
 import yaml
 from lib.seaf_converter import get_seaf_dictionary, DeviceDataMapper
 
+# C-реализация загрузчика YAML (libyaml), если она собрана в PyYAML
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Ключ сети на диаграмме: всё, кроме цифр, заменяется на '_'.
+# Для ASCII-строк (IP/маски) работает однопроходная таблица bytes.translate;
+# regex остаётся запасным путём для не-ASCII. Результат кэшируется, так как
+# одни и те же сети встречаются во многих линках
+_NON_DIGIT_RE = re.compile(r'\D')
+_NET_KEY_TBL = bytes(b if 0x30 <= b <= 0x39 else 0x5F for b in range(256))
+
+
+@lru_cache(maxsize=None)
+def _clean_network_key(network: str) -> str:
+    """Ключ сети для диаграммы: все символы, кроме цифр, заменены на '_'."""
+    try:
+        return network.encode('ascii').translate(_NET_KEY_TBL).decode('ascii')
+    except UnicodeEncodeError:
+        return _NON_DIGIT_RE.sub('_', network)
+
+
+# Шаблон HTML-подписи устройства: разбор формат-строки выполняется один раз
+_DEVICE_LABEL = ("&lt;font style=&quot;color: light-dark(rgb(0, 0, 0), rgb(237, 237, 237)); "
+                 "line-height: 140%%; font-size: 9px; &quot;&gt;&amp;nbsp;%s&amp;nbsp;&lt;/font&gt;").__mod__
+
+
+class PhysicalLinkRow(NamedTuple):
+    """Строка physical_links: колонки зафиксированы схемой, а не комментарием."""
+    device1: str
+    vendor1: str
+    type1: str
+    interface1: str
+    ip1: str
+    device2: str
+    vendor2: str
+    type2: str
+    interface2: str
+    ip2: str
+    network: str
+
+
+class MgmtEntryRow(NamedTuple):
+    """Строка mgmt_networks."""
+    device: str
+    vendor: str
+    type: str
+    interface: str
+    ip: str
+    network: str
+
+
+class LogicalLinkRow(NamedTuple):
+    """Строка logical_links полного (9-колоночного) формата."""
+    device1: str
+    vendor1: str
+    type1: str
+    interface1: str
+    device2: str
+    vendor2: str
+    type2: str
+    interface2: str
+    link_type: str
+
+
+class _PatternIndexes(NamedTuple):
+    """Производные от словаря patterns структуры, вычисляемые один раз."""
+    tpl_idx: Dict[str, Dict[str, Any]]
+    fallback_idx: Dict[str, Any]
+    default_template: Any
+    network_template: Any
+    phys_style: str
+    mgm_style: str
+    log_style: str
+
 
 class NetworkVisualizer:
     """
     Класс для генерации сетевых диаграмм в формате draw.io.
-    
+
     Инициализация с параметрами путей позволяет гибко настраивать расположение шаблонов.
     """
 
@@ -24,7 +99,7 @@ class NetworkVisualizer:
     ):
         """
         Инициализация визуализатора с настройкой путей к ресурсам.
-        
+
         Args:
             pattern_dir (str): Базовый каталог для презентационных материалов
             drawio_template (str): Шаблон DrawIO файла
@@ -33,10 +108,19 @@ class NetworkVisualizer:
         self.pattern_dir = Path(pattern_dir).resolve()
         self.drawio_template =  drawio_template
         self.drawio_stencil_templates = Path(drawio_stencil_templates).resolve()
+        # Итоговые пути к шаблонам считаются один раз, а не на каждый рендер
+        self._index_path = self.drawio_stencil_templates / 'index.yaml'
+        self._stencils_path = self.drawio_stencil_templates / 'stencils.yaml'
         self.data_pattern = get_seaf_dictionary()
-        
-        # Валидация базового каталога при инициализации
-        if not self.pattern_dir.exists() or not self.pattern_dir.is_dir():
+        # Кэш объединённых шаблонов stencils: (mtime-ключ, результат merge_yaml_files)
+        self._patterns_cache = None
+        self._patterns_cache_key = None
+        # Кэш производных от patterns индексов (см. _pattern_indexes)
+        self._pattern_idx = None
+        self._pattern_idx_src = None
+
+        # Валидация базового каталога при инициализации (is_dir покрывает и отсутствие пути)
+        if not self.pattern_dir.is_dir():
             sys.stderr.write(
                 f"❌ ОШИБКА: Базовый каталог презентации не найден: {self.pattern_dir}\n"
             )
@@ -50,147 +134,267 @@ class NetworkVisualizer:
         Returns:
             Dictionary with merged data
         """
-        directory = Path(self.drawio_stencil_templates)
-
-        # Read the index.yaml file
-        with open(directory / 'index.yaml', 'r', encoding='utf-8') as f:
-            index_data = yaml.safe_load(f)
+        index_path = self._index_path
+        devices_path = self._stencils_path
+
+        # Шаблоны не меняются в течение запуска: результат кэшируется на экземпляре
+        # и инвалидируется по mtime файлов. Один stat на файл вместо exists+stat
+        try:
+            devices_mtime = devices_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            devices_mtime = None
+        cache_key = (index_path.stat().st_mtime_ns, devices_mtime)
+        if self._patterns_cache is not None and self._patterns_cache_key == cache_key:
+            return self._patterns_cache
+
+        # Read the index.yaml file (бинарный режим: libyaml сам декодирует UTF-8)
+        with open(index_path, 'rb') as f:
+            index_data = yaml.load(f, Loader=_YAML_LOADER)
 
         # Read the devices.yaml file from the same directory
-        devices_path = directory / 'stencils.yaml'
-        if devices_path.exists():
-            with open(devices_path, 'r', encoding='utf-8') as f:
-                devices_data = yaml.safe_load(f)
+        if devices_mtime is not None:
+            with open(devices_path, 'rb') as f:
+                devices_data = yaml.load(f, Loader=_YAML_LOADER)
         else:
             # If devices.yaml doesn't exist, return the original index data
+            self._patterns_cache = index_data
+            self._patterns_cache_key = cache_key
             return index_data
 
         # Create a new dictionary with merged data
         result = {}
 
         # Process each vendor in the index
+        # (поиск и append через локальные имена - без повторного разрешения
+        # атрибутов и ключа vendor на каждой итерации)
+        devices_get = devices_data.get
         for vendor, device_list in index_data.get('templates', {}).items():
-            result[vendor] = []
+            bucket = result[vendor] = []
+            bucket_append = bucket.append
 
             # Process each device type in the vendor list
             for device_dict in device_list:
                 # device_dict is like {"carrier_switch": "switch"}
                 for device_type, device_name in device_dict.items():
                     # Get the corresponding device data from devices.yaml
-                    device_info = devices_data.get(device_name)
+                    device_info = devices_get(device_name)
 
                     if device_info is not None:
                         # Replace the string with the dictionary from devices.yaml
-                        result[vendor].append({device_type: device_info})
+                        bucket_append({device_type: device_info})
                     else:
                         # If device name not found in devices.yaml, keep the original
-                        result[vendor].append({device_type: device_name})
+                        bucket_append({device_type: device_name})
 
+        self._patterns_cache = result
+        self._patterns_cache_key = cache_key
         return result
 
+    def _pattern_indexes(self, patterns: Dict[str, Any]) -> _PatternIndexes:
+        """
+        Частичное вычисление производных от patterns структур: индексы шаблонов
+        устройств, дефолтный шаблон, шаблон network и стили линков.
 
-    def generate_device_list(self, data: Dict[str, Any], dev : List[Dict[str, Any]], patterns: Dict[str, Any]) -> Dict[str, Any]:
+        merge_yaml_files возвращает кэшированный объект patterns, поэтому
+        достаточно сверить идентичность: на повторных рендерах подготовка нулевая.
         """
-        Процедура формирования списка устройств на основе link_result и merge_yaml_files
+        if self._pattern_idx_src is patterns:
+            return self._pattern_idx
+
+        # {вендор: {тип_lc: шаблон}}, первый не-network шаблон вендора
+        # и первый встретившийся шаблон network
+        tpl_idx: Dict[str, Dict[str, Any]] = {}
+        fallback_idx: Dict[str, Any] = {}
+        network_template = None
+        for v, vendor_patterns in patterns.items():
+            types: Dict[str, Any] = {}
+            first_non_network = None
+            for pattern in vendor_patterns:
+                for key, template_data in pattern.items():
+                    key_lc = key.lower()
+                    types.setdefault(key_lc, template_data)
+                    if key_lc != 'network':
+                        if first_non_network is None:
+                            first_non_network = template_data
+                    elif network_template is None:
+                        network_template = template_data
+            tpl_idx[v] = types
+            fallback_idx[v] = first_non_network
+
+        default_template = None
+        for pattern in patterns.get('default', []):
+            if 'any' in pattern:
+                default_template = pattern['any']
+                break
+
+        link_styles: Dict[str, Any] = {}
+        if 'common' in patterns:
+            for pattern in patterns['common']:
+                for link_type, template_data in pattern.items():
+                    if link_type.lower() in ['logical_link', 'mgm_link', 'physical_link']:
+                        link_styles[link_type.lower()] = template_data
+
+        self._pattern_idx = _PatternIndexes(
+            tpl_idx,
+            fallback_idx,
+            default_template,
+            network_template,
+            link_styles.get('physical_link', {}).get('style', ''),
+            link_styles.get('mgm_link', {}).get('style', ''),
+            link_styles.get('logical_link', {}).get('style', ''),
+        )
+        self._pattern_idx_src = patterns
+        return self._pattern_idx
+
+    def _build_all(self, data: Dict[str, Any], dev: List[Dict[str, Any]],
+                   patterns: Dict[str, Any]) -> tuple:
+        """
+        Формирует устройства, сети и соединения одним обходом списков линков.
+
+        Раньше generate_device_list, generate_network_list и generate_links
+        независимо обходили physical_links/mgmt_networks/logical_links; здесь
+        каждый список читается ровно один раз, а индекс устройств, источники
+        сетей и соединения накапливаются одновременно.
 
         Args:
-            data (dict): Словарь с результатами линков, содержащий physical_links и mgmt_networks
-            patterns (dict): Словарь шаблонов устройств, где ключи - это вендоры, а значения - списки шаблонов
+            data (dict): Словарь с результатами линков
             dev (list): Список устройств с данными анализа
+            patterns (dict): Словарь шаблонов устройств
 
         Returns:
-            dict: Словарь в формате {имя_устройства: {данные_из_шаблона}}
+            tuple: (device_list, network_list, links)
         """
-        device_list = {}
-
-        # Извлекаем уникальные устройства из physical_links и mgmt_networks
-        unique_devices = set()
+        # Стили соединений берутся из предвычисленных индексов,
+        # bound-метод append выносится из горячих циклов
+        idx = self._pattern_indexes(patterns)
+        phys_style = idx.phys_style
+        mgm_style = idx.mgm_style
+        log_style = idx.log_style
+
+        # Индекс {устройство: (vendor, type)}; setdefault сохраняет приоритет
+        # источников: physical -> mgmt -> logical -> dev
+        dev2info: Dict[str, Any] = {}
+        # Источники сетей: 1 - physical, 2 - mgmt/смешанные, 3 - только logical
+        network_sources: Dict[str, int] = {}
+        links: List[Dict[str, Any]] = []
+        links_append = links.append
 
         # Обработка physical_links
         # Структура: [device1, vendor1, type1, interface1, ip1, device2, vendor2, type2, interface2, ip2, network]
-        if 'physical_links' in data:
-            for link in data['physical_links']:
-                if len(link) >= 11:  # Проверяем, что список содержит достаточно элементов
-                    device1 = link[0]
-                    device2 = link[5]
-                    unique_devices.add(device1)
-                    unique_devices.add(device2)
+        for link in data.get('physical_links', ()):
+            try:
+                device1, v1, t1, interface1, ip1, device2, v2, t2, interface2, ip2, network = link[:11]
+            except ValueError:
+                continue
+            dev2info.setdefault(device1, (v1.lower(), t1.lower()))
+            dev2info.setdefault(device2, (v2.lower(), t2.lower()))
+            # Слияние по приоритету: physical (1) всегда побеждает
+            network_sources[network] = 1
+            clean_network = _clean_network_key(network)
+            # Два соединения: от каждого устройства к сети
+            links_append({
+                'source': device1,
+                'target': clean_network,
+                'style': phys_style,
+                'label': ip1,
+                'data': None,
+                'src_label': interface1,
+                'pattern': 1
+            })
+            links_append({
+                'source': device2,
+                'target': clean_network,
+                'style': phys_style,
+                'label': ip2,
+                'data': None,
+                'src_label': interface2,
+                'pattern': 1
+            })
 
         # Обработка mgmt_networks
         # Структура: [device, vendor, type, interface, ip, network]
-        if 'mgmt_networks' in data:
-            for network in data['mgmt_networks']:
-                if len(network) >= 6:  # Проверяем, что список содержит достаточно элементов
-                    device = network[0]
-                    unique_devices.add(device)
+        for entry in data.get('mgmt_networks', ()):
+            try:
+                device, v1, t1, interface, ip, network = entry[:6]
+            except ValueError:
+                continue
+            dev2info.setdefault(device, (v1.lower(), t1.lower()))
+            # mgmt (2) не перекрывает physical (1)
+            network_sources.setdefault(network, 2)
+            links_append({
+                'source': device,
+                'target': _clean_network_key(network),
+                'style': mgm_style,
+                'label': ip,
+                'data': None,
+                'src_label': interface,
+                'pattern': 2
+            })
 
         # Обработка logical_links
         # Структура: [device1, vendor1, type1, interface1, device2, vendor2, type2, interface2, link_type]
-        if 'logical_links' in data:
-            for link in data['logical_links']:
-                if len(link) >= 7:  # Проверяем, что список содержит достаточно элементов
-                    device1 = link[0]
-                    device2 = link[4]
-                    unique_devices.add(device1)
-                    unique_devices.add(device2)
-
-        # Добавляем устройства из списка dev, если они ещё не добавлены
-        # Это нужно для одиночных устройств без связей
+        for link in data.get('logical_links', ()):
+            try:
+                device1, v1, t1, interface1, device2, v2, t2, interface2, link_type = link[:9]
+            except ValueError:
+                # Устаревший короткий формат даёт только имена устройств
+                try:
+                    device1, v1, t1, _if1, device2, v2, t2 = link[:7]
+                except ValueError:
+                    continue
+                dev2info.setdefault(device1, (v1.lower(), t1.lower()))
+                dev2info.setdefault(device2, (v2.lower(), t2.lower()))
+                continue
+            dev2info.setdefault(device1, (v1.lower(), t1.lower()))
+            dev2info.setdefault(device2, (v2.lower(), t2.lower()))
+            # Сеть может быть частью link_type, например "Service Network: 172.23.197.0/24"
+            if 'Network:' in link_type:
+                parts = link_type.split(':')
+                if len(parts) >= 2:
+                    network = parts[1].strip()
+                    # logical (3) присваивается только сетям, не виденным ранее
+                    network_sources.setdefault(network, 3)
+            links_append({
+                'source': device1,
+                'target': device2,
+                'style': log_style,
+                'label': "",  # В logical_links IP может не быть в явном виде
+                'data': self.data_pattern['logical_link'],
+                'src_label': interface1,
+                'trgt_label': interface2,
+                'pattern': 3
+            })
+
+        # Одиночные устройства без связей берутся из списка dev
         for device in dev:
-            device_name = device.get('device_name')
-            if device_name and device_name != 'unknown':
-                unique_devices.add(device_name)
+            fallback_name = device.get('device_name')
+            if fallback_name and fallback_name != 'unknown':
+                dev2info.setdefault(fallback_name, (
+                    device.get('vendor', 'unknown').lower(),
+                    device.get('device_type', 'unknown').lower(),
+                ))
+
+        device_list = self._resolve_device_templates(dev2info, dev, data, patterns)
+        network_list = self._build_network_list(network_sources, patterns)
+        return device_list, network_list, links
+
+    def _resolve_device_templates(self, dev2info: Dict[str, Any],
+                                  dev: List[Dict[str, Any]],
+                                  data: Dict[str, Any],
+                                  patterns: Dict[str, Any]) -> Dict[str, Any]:
+        """Подбирает шаблон stencil для каждого устройства из индекса dev2info."""
+        device_list = {}
 
-        # Для каждого уникального устройства находим соответствующий шаблон
-        for device_name in unique_devices:
-            # Находим информацию об устройстве в данных
-            vendor = None
-            device_type = None
-
-            # Ищем vendor и type в physical_links
-            if 'physical_links' in data:
-                for link in data['physical_links']:
-                    if len(link) >= 11:
-                        if link[0] == device_name:  # device1
-                            vendor = link[1].lower()
-                            device_type = link[2].lower()
-                            break
-                        elif link[5] == device_name:  # device2
-                            vendor = link[6].lower()
-                            device_type = link[7].lower()
-                            break
-
-            # Если не нашли в physical_links, ищем в mgmt_networks
-            if not vendor and not device_type and 'mgmt_networks' in data:
-                for network in data['mgmt_networks']:
-                    if len(network) >= 6:
-                        if network[0] == device_name:
-                            vendor = network[1].lower()
-                            device_type = network[2].lower()
-                            break
-
-            # Если всё ещё не нашли vendor и type, ищем в logical_links
-            if not vendor and not device_type and 'logical_links' in data:
-                for link in data['logical_links']:
-                    if len(link) >= 7:
-                        if link[0] == device_name:  # device1
-                            vendor = link[1].lower()
-                            device_type = link[2].lower()
-                            break
-                        elif link[4] == device_name:  # device2
-                            vendor = link[5].lower()
-                            device_type = link[6].lower()
-                            break
-
-            # Fallback: ищем vendor и device_type в списке dev
-            if not vendor and not device_type:
-                for device in dev:
-                    if device.get('device_name') == device_name:
-                        vendor = device.get('vendor', 'unknown').lower()
-                        device_type = device.get('device_type', 'unknown').lower()
-                        break
+        # Индексы шаблонов предвычислены на объект patterns (см. _pattern_indexes)
+        idx = self._pattern_indexes(patterns)
+        tpl_idx = idx.tpl_idx
+        fallback_idx = idx.fallback_idx
+        default_template = idx.default_template
 
+        # Для каждого уникального устройства находим соответствующий шаблон
+        for device_name, (vendor, device_type) in dev2info.items():
             # Если удалось определить vendor и type, ищем соответствующий шаблон
+            template_data = None
             if vendor and device_type:
                 # Ищем шаблон в словаре patterns
                 # patterns имеет структуру: {vendor: [{device_type: template_data}, ...]}
@@ -200,7 +404,7 @@ class NetworkVisualizer:
                     vendor.title(),                # "cisco asa" -> "Cisco Asa"
                     vendor.replace('_', ' ').title().replace(' ', '_'),  # "hpe_aruba" -> "Hpe_Aruba"
                 ]
-                
+
                 # Для вендоров с подчёркиванием типа "hpe_aruba" пробуем разные варианты регистра
                 if '_' in vendor:
                     parts = vendor.split('_')
@@ -211,84 +415,32 @@ class NetworkVisualizer:
                     if len(parts[0]) <= 3:
                         abbr_case = parts[0].upper() + '_' + '_'.join(p.capitalize() for p in parts[1:])
                         vendor_variants.append(abbr_case)
-                
+
                 # Для вендоров с пробелами типа "cisco asa" пробуем первое слово
                 if ' ' in vendor:
                     vendor_variants.append(vendor.replace('_', ' ').split()[0].capitalize())
                     # Дополнительно: для вендоров с пробелами типа "palo alto" пробуем "Palo_Alto"
                     underscore_variant = '_'.join(word.capitalize() for word in vendor.split())
                     vendor_variants.append(underscore_variant)
-                
-                vendor_key = None
-                for variant in vendor_variants:
-                    if variant in patterns:
-                        vendor_key = variant
-                        break
-                
+
+                vendor_key = next((v for v in vendor_variants if v in patterns), None)
+
                 if vendor_key:
-                    vendor_patterns = patterns[vendor_key]
-
-                    # Ищем шаблон для конкретного типа устройства
-                    for pattern in vendor_patterns:
-                        # pattern - это словарь в формате {device_type: template_data}
-                        for key, template_data in pattern.items():
-                            if key.lower() == device_type.lower():
-                                # Копируем шаблон и добавляем дополнительные поля
-                                device_data = template_data.copy()
-                                device_data['name'] = device_name
-                                device_data['id'] = device_name
-                                device_data['label'] = f"&lt;font style=&quot;color: light-dark(rgb(0, 0, 0), rgb(237, 237, 237)); line-height: 140%; font-size: 9px; &quot;&gt;&amp;nbsp;{device_name}&amp;nbsp;&lt;/font&gt;"
-                                device_list[device_name] = device_data
-                                break
-                        else:
-                            continue
-                        break
-
-                    # Если шаблон не найден, используем первый доступный шаблон вендора
-                    if device_name not in device_list:
-                        for pattern in vendor_patterns:
-                            for key, template_data in pattern.items():
-                                if key.lower() != 'network':  # Пропускаем шаблоны сетей
-                                    device_data = template_data.copy()
-                                    device_data['name'] = device_name
-                                    device_data['id'] = device_name
-                                    device_data['label'] = f"&lt;font style=&quot;color: light-dark(rgb(0, 0, 0), rgb(237, 237, 237)); line-height: 140%; font-size: 9px; &quot;&gt;&amp;nbsp;{device_name}&amp;nbsp;&lt;/font&gt;"
-                                    device_list[device_name] = device_data
-                                    break
-                            if device_name in device_list:
-                                break
-                
-                # Если всё ещё не нашли шаблон, используем default
-                if device_name not in device_list and 'default' in patterns:
-                    default_pattern = patterns['default']
-                    for pattern in default_pattern:
-                        for key, template_data in pattern.items():
-                            if key == 'any':
-                                device_data = template_data.copy()
-                                device_data['name'] = device_name
-                                device_data['id'] = device_name
-                                device_data['label'] = f"&lt;font style=&quot;color: light-dark(rgb(0, 0, 0), rgb(237, 237, 237)); line-height: 140%; font-size: 9px; &quot;&gt;&amp;nbsp;{device_name}&amp;nbsp;&lt;/font&gt;"
-                                device_list[device_name] = device_data
-                                break
-                        else:
-                            continue
-                        break
-            else:
-                # Если vendor и type не определены, используем дефолтный шаблон
-                if 'default' in patterns:
-                    default_pattern = patterns['default']
-                    for pattern in default_pattern:
-                        for key, template_data in pattern.items():
-                            if key == 'any':
-                                device_data = template_data.copy()
-                                device_data['name'] = device_name
-                                device_data['id'] = device_name
-                                device_data['label'] = f"&lt;font style=&quot;color: light-dark(rgb(0, 0, 0), rgb(237, 237, 237)); line-height: 140%; font-size: 9px; &quot;&gt;&amp;nbsp;{device_name}&amp;nbsp;&lt;/font&gt;"
-                                device_list[device_name] = device_data
-                                break
-                        else:
-                            continue
-                        break
+                    # Шаблон конкретного типа, иначе первый не-network шаблон вендора
+                    template_data = tpl_idx[vendor_key].get(device_type)
+                    if template_data is None:
+                        template_data = fallback_idx[vendor_key]
+
+            # Если всё ещё не нашли шаблон, используем default
+            if template_data is None:
+                template_data = default_template
+
+            if template_data is not None:
+                device_data = template_data.copy()
+                device_data['name'] = device_name
+                device_data['id'] = device_name
+                device_data['label'] = _DEVICE_LABEL(device_name)
+                device_list[device_name] = device_data
 
             device_list[device_name]['data'] = DeviceDataMapper.fill_network_component(
                 self.data_pattern['network_component'],
@@ -300,85 +452,13 @@ class NetworkVisualizer:
 
         return device_list
 
-
-    def generate_network_list(self, data: Dict[str, Any], patterns: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Процедура формирования перечня уникальных сетей на основе словарей
-        и формирующей словарь где в качестве ключа используется ip_mask
-        а в качестве шаблона используется данные шаблона ключ network
-
-        Args:
-            data (dict): Словарь с результатами линков, содержащий physical_links, mgmt_networks и logical_links
-            patterns (dict): Словарь шаблонов устройств
-
-        Returns:
-            dict: Словарь в формате {ip_mask: {данные_из_шаблона_network + дополнительные_поля}}
-        """
+    def _build_network_list(self, network_sources: Dict[str, int],
+                            patterns: Dict[str, Any]) -> Dict[str, Any]:
+        """Формирует словарь сетей с шаблоном network по накопленным источникам."""
         network_list = {}
 
-        # Извлекаем уникальные сети из physical_links, mgmt_networks и logical_links
-        network_sources = {}  # Словарь для отслеживания источников сетей
-
-        # Обработка physical_links
-        # Структура: [device1, vendor1, type1, interface1, ip1, device2, vendor2, type2, interface2, ip2, network]
-        if 'physical_links' in data:
-            for link in data['physical_links']:
-                if len(link) >= 11:  # Проверяем, что список содержит достаточно элементов
-                    network = link[10]  # Последний элемент - сеть
-                    if network not in network_sources:
-                        network_sources[network] = 1  # physical_links
-                    elif network_sources[network] != 1:  # Если сеть уже была найдена не в physical_links
-                        network_sources[network] = 2  # Обычная сеть (не только logical)
-
-        # Обработка mgmt_networks
-        # Структура: [device, vendor, type, interface, ip, network]
-        if 'mgmt_networks' in data:
-            for network_entry in data['mgmt_networks']:
-                if len(network_entry) >= 6:  # Проверяем, что список содержит достаточно элементов
-                    network = network_entry[5]  # Последний элемент - сеть
-                    if network not in network_sources:
-                        network_sources[network] = 2  # mgmt_networks (обычная сеть)
-                    elif network_sources[network] != 1:  # Если сеть уже была найдена не в physical_links
-                        # Оставляем текущее значение, если это не physical_links
-                        pass
-
-        # Обработка logical_links
-        # Структура: [device1, vendor1, type1, interface1, device2, vendor2, type2, interface2, link_type]
-        # Сети в logical_links могут быть представлены в link_type или других элементах
-        # В текущем формате, сеть может быть частью link_type, например "Service Network: 172.23.197.0/24"
-        if 'logical_links' in data:
-            for link in data['logical_links']:
-                if len(link) >= 9:  # Проверяем, что список содержит достаточно элементов
-                    link_type = link[8]  # Последний элемент - тип связи
-                    # Извлекаем сеть из строки типа связи, если она там содержится
-                    if 'Network:' in link_type:
-                        # Извлекаем маску сети из строки вида "Service Network: 172.23.197.0/24"
-                        parts = link_type.split(':')
-                        if len(parts) >= 2:
-                            network = parts[1].strip()
-                            if network not in network_sources:
-                                network_sources[network] = 3  # Только logical_links
-                            elif network_sources[network] != 1:  # Если не в physical_links
-                                if network_sources[network] == 3:  # Если была только в logical
-                                    # Если теперь встречается в других местах, становится обычной сетью
-                                    network_sources[network] = 2
-                                # Иначе оставляем как есть
-
-        # Теперь формируем словарь сетей с шаблонами
-        # Получаем шаблон network из словаря patterns
-        network_template = None
-        
-        # Ищем шаблон network в словаре patterns
-        for vendor, vendor_patterns in patterns.items():
-            for pattern in vendor_patterns:
-                for device_type, template_data in pattern.items():
-                    if device_type.lower() == 'network':
-                        network_template = template_data
-                        break
-                if network_template:
-                    break
-            if network_template:
-                break
+        # Шаблон network предвычислен на объект patterns (см. _pattern_indexes)
+        network_template = self._pattern_indexes(patterns).network_template
 
         # Формируем итоговый словарь
         for network, source_type in network_sources.items():
@@ -401,163 +481,79 @@ class NetworkVisualizer:
             else:
                 network_data['parent'] = 2
             # Заменяем все символы, кроме цифр, на _
-            clean_network_key = ''.join(c if c.isdigit() else '_' for c in network)
+            clean_network_key = _clean_network_key(network)
             network_list[clean_network_key] = network_data
 
         return network_list
 
-    def generate_links(self, data: Dict[str, Any], patterns: Dict[str, Any]) -> list:
+    def generate_device_list(self, data: Dict[str, Any], dev : List[Dict[str, Any]], patterns: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Процедура формирования массива словарей, представляющих соединения между устройствами и сетями
+        Процедура формирования списка устройств на основе link_result и merge_yaml_files
+
+        Args:
+            data (dict): Словарь с результатами линков, содержащий physical_links и mgmt_networks
+            patterns (dict): Словарь шаблонов устройств, где ключи - это вендоры, а значения - списки шаблонов
+            dev (list): Список устройств с данными анализа
+
+        Returns:
+            dict: Словарь в формате {имя_устройства: {данные_из_шаблона}}
+        """
+        return self._build_all(data, dev, patterns)[0]
+
+    def generate_network_list(self, data: Dict[str, Any], patterns: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Процедура формирования перечня уникальных сетей на основе словарей
+        и формирующей словарь где в качестве ключа используется ip_mask
+        а в качестве шаблона используется данные шаблона ключ network
 
         Args:
             data (dict): Словарь с результатами линков, содержащий physical_links, mgmt_networks и logical_links
             patterns (dict): Словарь шаблонов устройств
 
         Returns:
-            list: Массив словарей вида {source, target, style, label, data, src_label}
+            dict: Словарь в формате {ip_mask: {данные_из_шаблона_network + дополнительные_поля}}
         """
-        links = []
-
-        # Получаем шаблоны для различных типов соединений
-        link_styles = {}
-        
-        # Ищем шаблоны для различных типов соединений в словаре patterns
-        if 'common' in patterns:
-            for pattern in patterns['common']:
-                for link_type, template_data in pattern.items():
-                    if link_type.lower() in ['logical_link', 'mgm_link', 'physical_link']:
-                        link_styles[link_type.lower()] = template_data
+        return self._build_all(data, [], patterns)[1]
 
-        # Обработка physical_links
-        # Структура: [device1, vendor1, type1, interface1, ip1, device2, vendor2, type2, interface2, ip2, network]
-        if 'physical_links' in data:
-            for link in data['physical_links']:
-                if len(link) >= 11:  # Проверяем, что список содержит достаточно элементов
-                    device1 = link[0]  # device1
-                    interface1 = link[3]  # interface1
-                    ip1 = link[4]  # ip1
-                    device2 = link[5]  # device2
-                    interface2 = link[8]  # interface2
-                    ip2 = link[9]  # ip2
-                    network = link[10]  # network
-                    
-                    # Получаем стиль для physical_link
-                    style_data = link_styles.get('physical_link', {})
-                    style = style_data.get('style', '')
-                    
-                    # Заменяем все символы, кроме цифр, на _ в target
-                    clean_network = ''.join(c if c.isdigit() else '_' for c in network)
-                    
-                    # Создаем два соединения: от device1 к network и от device2 к network
-                    # Соединение от device1 к network
-                    link_dict1 = {
-                        'source': device1,
-                        'target': clean_network,
-                        'style': style,
-                        'label': ip1,
-                        'data': None,
-                        'src_label': interface1,
-                        'pattern': 1
-                    }
-                    links.append(link_dict1)
-                    
-                    # Соединение от device2 к network
-                    link_dict2 = {
-                        'source': device2,
-                        'target': clean_network,
-                        'style': style,
-                        'label': ip2,
-                        'data': None,
-                        'src_label': interface2,
-                        'pattern': 1
-                    }
-                    links.append(link_dict2)
+    def generate_links(self, data: Dict[str, Any], patterns: Dict[str, Any]) -> list:
+        """
+        Процедура формирования массива словарей, представляющих соединения между устройствами и сетями
 
-        # Обработка mgmt_networks
-        # Структура: [device, vendor, type, interface, ip, network]
-        if 'mgmt_networks' in data:
-            for entry in data['mgmt_networks']:
-                if len(entry) >= 6:
-                    device = entry[0]
-                    interface = entry[3]
-                    ip = entry[4]
-                    network = entry[5]
-                    
-                    # Получаем стиль для mgm_link
-                    style_data = link_styles.get('mgm_link', {})
-                    style = style_data.get('style', '')
-                    
-                    # Заменяем все символы, кроме цифр, на _ в target
-                    clean_network = ''.join(c if c.isdigit() else '_' for c in network)
-                    
-                    # Создаем соединение от устройства к упр. сети
-                    link_dict = {
-                        'source': device,
-                        'target': clean_network,
-                        'style': style,
-                        'label': ip,
-                        'data': None,
-                        'src_label': interface,
-                        'pattern': 2
-                    }
-                    links.append(link_dict)
+        Args:
+            data (dict): Словарь с результатами линков, содержащий physical_links, mgmt_networks и logical_links
+            patterns (dict): Словарь шаблонов устройств
 
-        # Обработка logical_links
-        # Структура: [device1, vendor1, type1, interface1, device2, vendor2, type2, interface2, link_type]
-        if 'logical_links' in data:
-            for link in data['logical_links']:
-                if len(link) >= 9:  # Проверяем, что список содержит достаточно элементов
-                    device1 = link[0]  # device1
-                    interface1 = link[3]  # interface1
-                    device2 = link[4]  # device2
-                    interface2 = link[7]  # interface2
-                    link_type = link[8]  # link_type (может содержать информацию о сети)
-
-                    # Извлекаем информацию о сети из link_type, если возможно
-                    network = link_type
-                    ip1 = ""  # В logical_links IP может не быть в явном виде
-                    
-                    if ':' in link_type:
-                        parts = link_type.split(':', 1)
-                        if len(parts) >= 2:
-                            network = parts[1].strip()
-                    
-                    # Получаем стиль для logical_link
-                    style_data = link_styles.get('logical_link', {})
-                    style = style_data.get('style', '')
-                    
-                    # Заменяем все символы, кроме цифр, на _ в target
-                    #clean_network = ''.join(c if c.isdigit() else '_' for c in network)
-                    
-                    # Создаем два соединения: от device1 к network и от device2 к network
-                    # Соединение от device1 к network
-                    link_dict1 = {
-                        'source': device1,
-                        'target': device2,
-                        'style': style,
-                        'label': ip1,
-                        'data': self.data_pattern['logical_link'],
-                        'src_label': interface1,
-                        'trgt_label': interface2,
-                        'pattern': 3
-                    }
-                    links.append(link_dict1)
-        return links
+        Returns:
+            list: Массив словарей вида {source, target, style, label, data, src_label}
+        """
+        return self._build_all(data, [], patterns)[2]
 
     def prepare_stencils(self, data : Dict[str, Any],  dev : List[Dict[str, Any]], layout_algorithm: str = 'circular'):
 
         # 1. Формируем словари шаблонов
         patterns = self.merge_yaml_files()
 
-        # 2. Формируем перечень устройств для размещения на диаграмме
-        devices = self.generate_device_list(data=data, dev=dev, patterns=patterns)
-
-        # 3. Формируем перечень сетей для размещения на диаграмме
-        networks = self.generate_network_list(data=data, patterns=patterns)
+        # Строки линков приводятся к именованным кортежам один раз на входе:
+        # кортежи распаковываются быстрее списков, а схема колонок видна по типу.
+        # Короткие строки (устаревший формат) остаются как есть и отсеиваются ниже
+        data = {
+            **data,
+            'physical_links': [
+                PhysicalLinkRow._make(row[:11]) if len(row) >= 11 else row
+                for row in data.get('physical_links', [])
+            ],
+            'mgmt_networks': [
+                MgmtEntryRow._make(row[:6]) if len(row) >= 6 else row
+                for row in data.get('mgmt_networks', [])
+            ],
+            'logical_links': [
+                LogicalLinkRow._make(row[:9]) if len(row) >= 9 else row
+                for row in data.get('logical_links', [])
+            ],
+        }
 
-        # 4. Формируем перечень линков
-        links = self.generate_links(data=data, patterns=patterns)
+        # 2-4. Устройства, сети и линки собираются одним обходом списков
+        devices, networks, links = self._build_all(data, dev, patterns)
 
         # 5. Подготавливаем объекты для алгоритма размещения
         objects = {
@@ -775,14 +771,62 @@ class NetworkVisualizer:
             dict: Модифицированный словарь с проставленными координатами
         """
         import math
+        cos, sin = math.cos, math.sin  # локальные имена для горячих циклов
 
         devices = objects['devices']
         networks = objects['networks']
 
+        center_x, center_y = 0, 0
+        two_pi = 2 * math.pi
+
+        def place_ring(items, radius, target):
+            # Все координаты кольца считаются одним проходом: данные объекта
+            # уже на руках, без повторного поиска по ключу на каждую координату
+            n = len(items)
+            if n == 0:
+                return
+            angle_step = two_pi / n
+            for i, (obj_id, obj_data) in enumerate(items):
+                angle = i * angle_step
+                x = center_x + radius * cos(angle) - obj_data.get('width', 50) / 2
+                y = center_y + radius * sin(angle) - obj_data.get('height', 50) / 2
+
+                # Округляем координаты до ближайшего целого
+                target[obj_id]['x'] = round(x)
+                target[obj_id]['y'] = round(y)
+
+        def place_networks_by_pattern(group, ring_radius, base_radius=None):
+            # Группируем сети по значению pattern
+            pattern_groups = {}
+            for obj_id, obj_data in group.items():
+                pattern_groups.setdefault(obj_data.get('pattern', 0), []).append((obj_id, obj_data))
+
+            n_patterns = len(pattern_groups)
+            if n_patterns > 1:
+                # Размещаем каждую подгруппу на отдельном круге с общим центром,
+                # радиусы наращиваем с учетом высоты элементов и circular_padding
+                pattern_max_heights = [
+                    max(obj_data.get('height', 50) for _, obj_data in pattern_networks)
+                    for pattern_networks in pattern_groups.values()
+                ]
+
+                if base_radius is None:
+                    current_radius = circular_padding  # Минимальный радиус
+                else:
+                    current_radius = base_radius - (sum(pattern_max_heights) + (n_patterns - 1) * circular_padding)
+                    if current_radius < 0:
+                        current_radius = circular_padding  # Минимальный радиус
+
+                for max_height, pattern_networks in zip(pattern_max_heights, pattern_groups.values()):
+                    place_ring(pattern_networks, current_radius, objects['networks'])
+
+                    # Увеличиваем радиус для следующей группы
+                    current_radius += max_height + circular_padding
+            else:
+                # Если только одна группа по pattern, размещаем как обычно
+                place_ring(list(group.items()), ring_radius, objects['networks'])
+
         # Определяем, какие элементы будут во внутреннем круге
-        inner_group = None
-        outer_group = None
-        
         if len(devices) <= len(networks):
             # Устройства во внутреннем круге, сети во внешнем
             inner_group = devices
@@ -799,228 +843,49 @@ class NetworkVisualizer:
         # Рассчитываем максимальные размеры для корректного определения радиусов
         max_inner_size = 0
         max_outer_size = 0
-        
+
         for obj_data in inner_group.values():
             w = obj_data.get('width', 50)
             h = obj_data.get('height', 50)
             max_inner_size = max(max_inner_size, w, h)
-            
+
         for obj_data in outer_group.values():
             w = obj_data.get('width', 50)
             h = obj_data.get('height', 50)
             max_outer_size = max(max_outer_size, w, h)
-        
+
         max_obj_size = max(max_inner_size, max_outer_size)
 
         # Рассчитываем радиусы для внутреннего и внешнего кругов
         n_inner = len(inner_group)
         n_outer = len(outer_group)
-        
+
         if n_inner > 0:
             inner_radius = max((n_inner * (max_inner_size + padding)) / (2 * math.pi), max_inner_size + padding)
         else:
             inner_radius = 0
-            
+
         if n_outer > 0:
             # Учитываем высоту элементов и circular_padding для избежания пересечений
             outer_radius = max((n_outer * (max_outer_size + padding)) / (2 * math.pi), inner_radius + max(max_inner_size, max_outer_size) + circular_padding)
         else:
             outer_radius = inner_radius + max_obj_size + circular_padding
 
-        center_x, center_y = 0, 0
-
         # Размещаем внутренние объекты
         if n_inner > 0:
-            # Если внутренняя группа - это сети, то разделяем их на подгруппы по pattern
             if inner_label == 'networks':
-                # Группируем сети по значению pattern
-                pattern_groups = {}
-                for obj_id, obj_data in inner_group.items():
-                    pattern_value = obj_data.get('pattern', 0)
-                    if pattern_value not in pattern_groups:
-                        pattern_groups[pattern_value] = []
-                    pattern_groups[pattern_value].append(obj_id)
-                
-                # Рассчитываем параметры для размещения подгрупп
-                n_patterns = len(pattern_groups)
-                if n_patterns > 1:
-                    # Размещаем каждую подгруппу на отдельном круге с общим центром
-                    # Рассчитываем радиусы для каждой подгруппы с учетом высоты элементов и circular_padding
-                    # Нужно учитывать максимальную высоту элементов в каждой группе
-                    pattern_max_heights = {}
-                    for pattern_val, pattern_networks in pattern_groups.items():
-                        max_h = 0
-                        for obj_id in pattern_networks:
-                            h = inner_group[obj_id].get('height', 50)
-                            max_h = max(max_h, h)
-                        pattern_max_heights[pattern_val] = max_h
-                    
-                    # Рассчитываем радиусы с учетом высоты элементов и circular_padding
-                    # Начинаем с минимального радиуса и увеличиваем его для каждой группы
-                    current_radius = circular_padding  # Минимальный радиус
-                    for idx, (pattern_val, pattern_networks) in enumerate(pattern_groups.items()):
-                        n_subgroup = len(pattern_networks)
-                        if n_subgroup > 0:
-                            # Рассчитываем радиус для этой подгруппы с учетом высоты элементов
-                            max_height = pattern_max_heights[pattern_val]
-                            
-                            subgroup_radius = current_radius
-                            subgroup_angle_step = 2 * math.pi / n_subgroup
-                            
-                            for j, obj_id in enumerate(pattern_networks):
-                                angle = j * subgroup_angle_step
-                                x = center_x + subgroup_radius * math.cos(angle) - inner_group[obj_id].get('width', 50) / 2
-                                y = center_y + subgroup_radius * math.sin(angle) - inner_group[obj_id].get('height', 50) / 2
-
-                                # Округляем координаты до ближайшего целого
-                                x = round(x)
-                                y = round(y)
-
-                                objects['networks'][obj_id]['x'] = x
-                                objects['networks'][obj_id]['y'] = y
-                            
-                            # Увеличиваем радиус для следующей группы
-                            current_radius += max_height + circular_padding
-                        else:
-                            # Если в подгруппе нет элементов, размещаем в центре
-                            obj_id = pattern_networks[0]
-                            x = center_x - inner_group[obj_id].get('width', 50) / 2
-                            y = center_y - inner_group[obj_id].get('height', 50) / 2
-
-                            # Округляем координаты до ближайшего целого
-                            x = round(x)
-                            y = round(y)
-
-                            objects['networks'][obj_id]['x'] = x
-                            objects['networks'][obj_id]['y'] = y
-                else:
-                    # Если только одна группа по pattern, размещаем как обычно
-                    inner_angle_step = 2 * math.pi / n_inner if n_inner > 0 else 0
-                    for i, obj_id in enumerate(inner_group.keys()):
-                        angle = i * inner_angle_step
-                        x = center_x + inner_radius * math.cos(angle) - inner_group[obj_id].get('width', 50) / 2
-                        y = center_y + inner_radius * math.sin(angle) - inner_group[obj_id].get('height', 50) / 2
-
-                        # Округляем координаты до ближайшего целого
-                        x = round(x)
-                        y = round(y)
-
-                        # Обновляем координаты в соответствующем словаре
-                        objects['networks'][obj_id]['x'] = x
-                        objects['networks'][obj_id]['y'] = y
+                place_networks_by_pattern(inner_group, inner_radius)
             else:
                 # Если внутренняя группа - устройства, размещаем как обычно
-                inner_angle_step = 2 * math.pi / n_inner if n_inner > 0 else 0
-                for i, obj_id in enumerate(inner_group.keys()):
-                    angle = i * inner_angle_step
-                    x = center_x + inner_radius * math.cos(angle) - inner_group[obj_id].get('width', 50) / 2
-                    y = center_y + inner_radius * math.sin(angle) - inner_group[obj_id].get('height', 50) / 2
-
-                    # Округляем координаты до ближайшего целого
-                    x = round(x)
-                    y = round(y)
-
-                    # Обновляем координаты в соответствующем словаре
-                    objects['devices'][obj_id]['x'] = x
-                    objects['devices'][obj_id]['y'] = y
+                place_ring(list(inner_group.items()), inner_radius, objects['devices'])
 
         # Размещаем внешние объекты
         if n_outer > 0:
-            # Если внешняя группа - это сети, то разделяем их на подгруппы по pattern
             if outer_label == 'networks':
-                # Группируем сети по значению pattern
-                pattern_groups = {}
-                for obj_id, obj_data in outer_group.items():
-                    pattern_value = obj_data.get('pattern', 0)
-                    if pattern_value not in pattern_groups:
-                        pattern_groups[pattern_value] = []
-                    pattern_groups[pattern_value].append(obj_id)
-                
-                # Рассчитываем параметры для размещения подгрупп
-                n_patterns = len(pattern_groups)
-                if n_patterns > 1:
-                    # Размещаем каждую подгруппу на отдельном круге с общим центром
-                    # Рассчитываем радиусы для каждой подгруппы с учетом высоты элементов и circular_padding
-                    # Нужно учитывать максимальную высоту элементов в каждой группе
-                    pattern_max_heights = {}
-                    for pattern_val, pattern_networks in pattern_groups.items():
-                        max_h = 0
-                        for obj_id in pattern_networks:
-                            h = outer_group[obj_id].get('height', 50)
-                            max_h = max(max_h, h)
-                        pattern_max_heights[pattern_val] = max_h
-                    
-                    # Рассчитываем радиусы с учетом высоты элементов и circular_padding
-                    # Начинаем с минимального радиуса и увеличиваем его для каждой группы
-                    current_radius = outer_radius - (sum(pattern_max_heights.values()) + (n_patterns - 1) * circular_padding)
-                    if current_radius < 0:
-                        current_radius = circular_padding  # Минимальный радиус
-                    
-                    for idx, (pattern_val, pattern_networks) in enumerate(pattern_groups.items()):
-                        n_subgroup = len(pattern_networks)
-                        if n_subgroup > 0:
-                            # Рассчитываем радиус для этой подгруппы с учетом высоты элементов
-                            max_height = pattern_max_heights[pattern_val]
-                            
-                            subgroup_radius = current_radius
-                            subgroup_angle_step = 2 * math.pi / n_subgroup
-                            
-                            for j, obj_id in enumerate(pattern_networks):
-                                angle = j * subgroup_angle_step
-                                x = center_x + subgroup_radius * math.cos(angle) - outer_group[obj_id].get('width', 50) / 2
-                                y = center_y + subgroup_radius * math.sin(angle) - outer_group[obj_id].get('height', 50) / 2
-
-                                # Округляем координаты до ближайшего целого
-                                x = round(x)
-                                y = round(y)
-
-                                objects['networks'][obj_id]['x'] = x
-                                objects['networks'][obj_id]['y'] = y
-                            
-                            # Увеличиваем радиус для следующей группы
-                            current_radius += max_height + circular_padding
-                        else:
-                            # Если в подгруппе нет элементов, размещаем в центре
-                            obj_id = pattern_networks[0]
-                            x = center_x - outer_group[obj_id].get('width', 50) / 2
-                            y = center_y - outer_group[obj_id].get('height', 50) / 2
-
-                            # Округляем координаты до ближайшего целого
-                            x = round(x)
-                            y = round(y)
-
-                            objects['networks'][obj_id]['x'] = x
-                            objects['networks'][obj_id]['y'] = y
-                else:
-                    # Если только одна группа по pattern, размещаем как обычно
-                    outer_angle_step = 2 * math.pi / n_outer if n_outer > 0 else 0
-                    for i, obj_id in enumerate(outer_group.keys()):
-                        angle = i * outer_angle_step
-                        x = center_x + outer_radius * math.cos(angle) - outer_group[obj_id].get('width', 50) / 2
-                        y = center_y + outer_radius * math.sin(angle) - outer_group[obj_id].get('height', 50) / 2
-
-                        # Округляем координаты до ближайшего целого
-                        x = round(x)
-                        y = round(y)
-
-                        # Обновляем координаты в соответствующем словаре
-                        objects['networks'][obj_id]['x'] = x
-                        objects['networks'][obj_id]['y'] = y
+                place_networks_by_pattern(outer_group, outer_radius, base_radius=outer_radius)
             else:
                 # Если внешняя группа - устройства, размещаем как обычно
-                outer_angle_step = 2 * math.pi / n_outer if n_outer > 0 else 0
-                for i, obj_id in enumerate(outer_group.keys()):
-                    angle = i * outer_angle_step
-                    x = center_x + outer_radius * math.cos(angle) - outer_group[obj_id].get('width', 50) / 2
-                    y = center_y + outer_radius * math.sin(angle) - outer_group[obj_id].get('height', 50) / 2
-
-                    # Округляем координаты до ближайшего целого
-                    x = round(x)
-                    y = round(y)
-
-                    # Обновляем координаты в соответствующем словаре
-                    objects['devices'][obj_id]['x'] = x
-                    objects['devices'][obj_id]['y'] = y
+                place_ring(list(outer_group.items()), outer_radius, objects['devices'])
 
         return objects
 
@@ -1106,20 +971,20 @@ class NetworkVisualizer:
                 # Находим максимальные координаты
                 max_x = max(pos[0] for pos in group_relative_positions[group_name].values())
                 max_y = max(pos[1] for pos in group_relative_positions[group_name].values())
-                
+
                 # Находим ширину и высоту последнего элемента
                 last_obj = list(group_objects.values())[-1]
                 last_width = last_obj.get('width', 50)
                 last_height = last_obj.get('height', 50)
-                
+
                 # Определяем общую ширину и высоту группы
                 group_width = max_x + last_width
                 group_height = max_y + last_height
-                
+
                 # Добавляем padding по периметру
                 padded_width = group_width + 2 * padding
                 padded_height = group_height + 2 * padding
-                
+
                 group_bounds[group_name] = {
                     'width': padded_width,
                     'height': padded_height,
@@ -1171,11 +1036,11 @@ class NetworkVisualizer:
             for obj_id in group_objects.keys():
                 if group_name in group_relative_positions and obj_id in group_relative_positions[group_name]:
                     rel_x, rel_y = group_relative_positions[group_name][obj_id]
-                    
+
                     # Абсолютная позиция = позиция группы + относительная позиция объекта в группе
                     abs_x = group_pos_x + rel_x + padding  # добавляем padding для компенсации периметра
                     abs_y = group_pos_y + rel_y + padding
-                    
+
                     # Обновляем координаты в основном словаре
                     if obj_id in objects['devices']:
                         objects['devices'][obj_id]['x'] = abs_x
@@ -1195,6 +1060,135 @@ class NetworkVisualizer:
 
         return objects
 
+    @staticmethod
+    def _build_adjacency(links):
+        """
+        Граф смежности по списку соединений: {узел: {сосед: None}}.
+
+        Вложенный dict работает как упорядоченное множество: вставка и
+        проверка за O(1), порядок соседей совпадает с порядком линков.
+        Результат не кэшируется намеренно: список links изменяем, а каждый
+        вызов layout-алгоритма строит граф ровно один раз.
+        """
+        from collections import defaultdict
+
+        graph = defaultdict(dict)
+        for link in links:
+            graph[link['source']][link['target']] = None
+            graph[link['target']][link['source']] = None
+        return graph
+
+    @staticmethod
+    def _barnes_hut_repulsion(pos, disp, diag, is_device, padding,
+                              k_dd, k_nn, k_dn, theta=0.9):
+        """
+        Приближённый расчёт отталкивания через квадродерево (Барнс - Хат).
+
+        Дальние скопления узлов заменяются их центром масс, что снижает шаг
+        с O(n^2) до O(n log n); точность регулируется theta. Массы устройств
+        и сетей копятся в ячейках раздельно, чтобы сохранить разные
+        коэффициенты отталкивания для пар устройство/сеть.
+        """
+        import math
+        sqrt = math.sqrt
+
+        n = len(pos)
+        min_x = min(p[0] for p in pos)
+        max_x = max(p[0] for p in pos)
+        min_y = min(p[1] for p in pos)
+        max_y = max(p[1] for p in pos)
+
+        # Ячейка дерева: [cx, cy, half, sum_x, sum_y, mass_dev, mass_net,
+        # children, points]; children - четыре потомка либо None,
+        # points - индексы точек листа
+        root = [(min_x + max_x) / 2, (min_y + max_y) / 2,
+                max(max_x - min_x, max_y - min_y) / 2 + 1.0,
+                0.0, 0.0, 0, 0, None, []]
+
+        def child_for(node, i):
+            quadrant = (pos[i][0] > node[0]) + 2 * (pos[i][1] > node[1])
+            child = node[7][quadrant]
+            if child is None:
+                h = node[2] / 2
+                child = node[7][quadrant] = [
+                    node[0] + (h if pos[i][0] > node[0] else -h),
+                    node[1] + (h if pos[i][1] > node[1] else -h),
+                    h, 0.0, 0.0, 0, 0, None, []]
+            return child
+
+        def insert(node, i, depth):
+            node[3] += pos[i][0]
+            node[4] += pos[i][1]
+            node[5 if is_device[i] else 6] += 1
+            if node[7] is not None:
+                insert(child_for(node, i), i, depth + 1)
+                return
+            points = node[8]
+            points.append(i)
+            if len(points) > 1 and depth < 32:
+                # лист переполнен: точки спускаются в потомков
+                # (суммы текущей ячейки их уже учитывают)
+                node[7] = [None, None, None, None]
+                node[8] = []
+                for j in points:
+                    insert(child_for(node, j), j, depth + 1)
+
+        for i in range(n):
+            insert(root, i, 0)
+
+        k_dd2 = k_dd * k_dd
+        k_nn2 = k_nn * k_nn
+        k_dn2 = k_dn * k_dn
+
+        for i in range(n):
+            xi, yi = pos[i]
+            disp_i = disp[i]
+            dev_i = is_device[i]
+            diag_i = diag[i]
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                total = node[5] + node[6]
+                if not total:
+                    continue
+                if node[7] is None:
+                    # лист: точный парный расчёт, как в полном цикле
+                    for j in node[8]:
+                        if j == i:
+                            continue
+                        dx = xi - pos[j][0]
+                        dy = yi - pos[j][1]
+                        min_distance = (diag_i + diag[j])/2 + padding
+                        distance = max(sqrt(dx*dx + dy*dy), 0.1)
+                        if dev_i and is_device[j]:
+                            k2 = k_dd2
+                        elif not dev_i and not is_device[j]:
+                            k2 = k_nn2
+                        else:
+                            k2 = k_dn2
+                        if distance < min_distance:
+                            repulsion_force = k2 / distance * (min_distance / distance)**2
+                        else:
+                            repulsion_force = k2 / distance
+                        scale = repulsion_force / distance
+                        disp_i[0] += dx * scale
+                        disp_i[1] += dy * scale
+                    continue
+                dx = xi - node[3] / total
+                dy = yi - node[4] / total
+                distance = max(sqrt(dx*dx + dy*dy), 0.1)
+                if node[2] * 2 / distance < theta:
+                    # ячейка достаточно далеко: действует как центр масс
+                    if dev_i:
+                        k2 = k_dd2 * node[5] + k_dn2 * node[6]
+                    else:
+                        k2 = k_dn2 * node[5] + k_nn2 * node[6]
+                    scale = k2 / distance / distance
+                    disp_i[0] += dx * scale
+                    disp_i[1] += dy * scale
+                else:
+                    stack.extend(child for child in node[7] if child is not None)
+
     @staticmethod
     def layout_algorithm_force_directed(objects: dict, padding: int = 5) -> dict:
         """
@@ -1209,6 +1203,7 @@ class NetworkVisualizer:
         """
         import random
         import math
+        cos, sin, sqrt = math.cos, math.sin, math.sqrt  # локальные имена для горячих циклов
 
         all_objects = {}
         all_objects.update(objects['devices'])
@@ -1217,41 +1212,45 @@ class NetworkVisualizer:
         n = len(all_objects)
         if n <= 1:
             # Если один или нет объектов, просто размещаем в начале координат
-            for obj_id in all_objects.keys():
-                if obj_id in objects['devices']:
-                    objects['devices'][obj_id]['x'] = 0
-                    objects['devices'][obj_id]['y'] = 0
-                elif obj_id in objects['networks']:
-                    objects['networks'][obj_id]['x'] = 0
-                    objects['networks'][obj_id]['y'] = 0
+            for bucket in (objects['devices'], objects['networks']):
+                for obj_data in bucket.values():
+                    obj_data['x'] = 0
+                    obj_data['y'] = 0
             return objects
 
+        # Создаем граф на основе связей
+        graph = NetworkVisualizer._build_adjacency(objects['links'])
+
+        # Узлы без единой связи в силовой модели не участвуют: их положение
+        # отталкиванием всё равно не уточняется, а исключение сокращает
+        # квадратичную часть с n^2 до k^2. Они упаковываются сеткой справа
+        ids = [obj_id for obj_id in all_objects if obj_id in graph]
+        isolated_ids = [obj_id for obj_id in all_objects if obj_id not in graph]
+        n = len(ids)
+
+        # Представление "структура массивов": узлы адресуются целым индексом,
+        # позиции и смещения лежат в параллельных списках, а размеры и тип
+        # объекта предвычислены - в O(n^2)-цикле не остаётся словарных поисков.
+        # (В заявке предлагался numpy; проект обходится без бинарных
+        # зависимостей, поэтому берём ту же компоновку на списках.)
+        node_idx = {obj_id: i for i, obj_id in enumerate(ids)}
+
         # Инициализация позиций по кругу для более равномерного распределения
-        positions = {}
         angle_step = 2 * math.pi / n if n > 0 else 0
         radius = max(50, n * 15)  # Уменьшенный радиус для меньшего начального расстояния
 
-        for i, obj_id in enumerate(all_objects.keys()):
-            angle = i * angle_step
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            positions[obj_id] = [x, y]
+        pos = [[radius * cos(i * angle_step), radius * sin(i * angle_step)] for i in range(n)]
 
-        # Создаем граф на основе связей
-        graph = {}
-        for link in objects['links']:
-            source = link['source']
-            target = link['target']
+        # Диагональ объекта и признак "устройство" по индексу узла
+        diag = [sqrt(all_objects[obj_id].get('width', 50) ** 2 + all_objects[obj_id].get('height', 50) ** 2)
+                for obj_id in ids]
+        is_device = [obj_id in objects['devices'] for obj_id in ids]
 
-            if source not in graph:
-                graph[source] = []
-            if target not in graph:
-                graph[target] = []
-
-            if target not in graph[source]:
-                graph[source].append(target)
-            if source not in graph[target]:
-                graph[target].append(source)
+        # Смежность переводится в индексную форму один раз, до итераций
+        adjacency = [
+            (node_idx[node], [node_idx[neighbor] for neighbor in neighbors if neighbor in node_idx])
+            for node, neighbors in graph.items() if node in node_idx
+        ]
 
         # Параметры алгоритма
         k_repulsion_device_device = 25  # Уменьшенный коэффициент отталкивания между устройствами
@@ -1261,34 +1260,43 @@ class NetworkVisualizer:
         iterations = 40  # Уменьшенное количество итераций для уменьшения разброса
         initial_temperature = 60  # Уменьшенная начальная температура для ограничения смещений
 
+        # На больших графах квадратичное отталкивание заменяется
+        # приближением Барнса - Хата; на обычных диаграммах точный расчёт
+        use_barnes_hut = n > 400
+
         for iteration in range(iterations):
-            displacement = {node: [0, 0] for node in positions}
+            disp = [[0, 0] for _ in range(n)]
 
             # Сила отталкивания между узлами с учетом типов объектов и их размеров
-            for v in positions:
-                for u in positions:
-                    if v != u:
-                        dx = positions[v][0] - positions[u][0]
-                        dy = positions[v][1] - positions[u][1]
-
-                        # Учитываем размеры объектов при расчете расстояния
-                        v_width = all_objects[v].get('width', 50)
-                        v_height = all_objects[v].get('height', 50)
-                        u_width = all_objects[u].get('width', 50)
-                        u_height = all_objects[u].get('height', 50)
+            if use_barnes_hut:
+                NetworkVisualizer._barnes_hut_repulsion(
+                    pos, disp, diag, is_device, padding,
+                    k_repulsion_device_device,
+                    k_repulsion_network_network,
+                    k_repulsion_device_network)
+            else:
+                # Третий закон Ньютона: пара (i, j) считается один раз,
+                # узлу j достаётся та же сила с обратным знаком
+                for i in range(n):
+                    # всё, что зависит только от i, выносится из внутреннего цикла
+                    xi, yi = pos[i]
+                    disp_i = disp[i]
+                    dev_i = is_device[i]
+                    diag_i = diag[i]
+                    for j in range(i + 1, n):
+                        pos_j = pos[j]
+                        dx = xi - pos_j[0]
+                        dy = yi - pos_j[1]
 
                         # Минимальное расстояние между центрами объектов с учетом их размеров и паддинга
-                        min_distance = (math.sqrt(v_width**2 + v_height**2) + math.sqrt(u_width**2 + u_height**2))/2 + padding
+                        min_distance = (diag_i + diag[j])/2 + padding
 
-                        distance = max(math.sqrt(dx*dx + dy*dy), 0.1)
+                        distance = max(sqrt(dx*dx + dy*dy), 0.1)
 
                         # Определяем типы объектов для выбора коэффициента отталкивания
-                        v_is_device = v in objects['devices']
-                        u_is_device = u in objects['devices']
-
-                        if v_is_device and u_is_device:
+                        if dev_i and is_device[j]:
                             k_repulsion = k_repulsion_device_device
-                        elif not v_is_device and not u_is_device:
+                        elif not dev_i and not is_device[j]:
                             k_repulsion = k_repulsion_network_network
                         else:
                             k_repulsion = k_repulsion_device_network
@@ -1300,68 +1308,109 @@ class NetworkVisualizer:
                         else:
                             repulsion_force = k_repulsion * k_repulsion / distance
 
-                        displacement[v][0] += (dx / distance) * repulsion_force
-                        displacement[v][1] += (dy / distance) * repulsion_force
+                        # одно деление на пару вместо двух
+                        scale = repulsion_force / distance
+                        fx = dx * scale
+                        fy = dy * scale
+                        disp_i[0] += fx
+                        disp_i[1] += fy
+                        disp_j = disp[j]
+                        disp_j[0] -= fx
+                        disp_j[1] -= fy
 
             # Сила притяжения для связанных узлов
-            for node in graph:
-                if node in positions:  # Проверяем, что узел существует в positions
-                    for neighbor in graph[node]:
-                        if neighbor in positions:  # Проверяем, что сосед существует в positions
-                            dx = positions[neighbor][0] - positions[node][0]
-                            dy = positions[neighbor][1] - positions[node][1]
-                            distance = max(math.sqrt(dx*dx + dy*dy), 0.1)
-
-                            # Притягивающая сила (чем дальше, тем сильнее притяжение)
-                            # Для связанных узлов (устройство-сеть) используем усиленное притяжение
-                            if (node in objects['devices']) != (neighbor in objects['devices']):
-                                # Устройства и сети, которые связаны, должны сильнее притягиваться друг к другу
-                                attraction_force = (distance * distance) * k_attraction / k_repulsion_device_network
-                                # Увеличиваем притяжение для связанных элементов
-                                attraction_force *= 1.5  # Усиливаем притяжение для связанных элементов
-                            else:
-                                # Для одинаковых типов объектов (устройство-устройство или сеть-сеть)
-                                attraction_force = (distance * distance) * k_attraction / k_repulsion_device_device
-                            
-                            # Ограничиваем силу притяжения, чтобы не было чрезмерного сближения
-                            max_attraction = 35
-                            attraction_force = min(attraction_force, max_attraction)
-                            
-                            displacement[node][0] += (dx / distance) * attraction_force
-                            displacement[node][1] += (dy / distance) * attraction_force
+            for i, neighbors in adjacency:
+                xi, yi = pos[i]
+                disp_i = disp[i]
+                dev_i = is_device[i]
+                for j in neighbors:
+                    pos_j = pos[j]
+                    dx = pos_j[0] - xi
+                    dy = pos_j[1] - yi
+                    distance = max(sqrt(dx*dx + dy*dy), 0.1)
+
+                    # Притягивающая сила (чем дальше, тем сильнее притяжение)
+                    # Для связанных узлов (устройство-сеть) используем усиленное притяжение
+                    if dev_i != is_device[j]:
+                        # Устройства и сети, которые связаны, должны сильнее притягиваться друг к другу
+                        attraction_force = (distance * distance) * k_attraction / k_repulsion_device_network
+                        # Увеличиваем притяжение для связанных элементов
+                        attraction_force *= 1.5  # Усиливаем притяжение для связанных элементов
+                    else:
+                        # Для одинаковых типов объектов (устройство-устройство или сеть-сеть)
+                        attraction_force = (distance * distance) * k_attraction / k_repulsion_device_device
+
+                    # Ограничиваем силу притяжения, чтобы не было чрезмерного сближения
+                    max_attraction = 35
+                    attraction_force = min(attraction_force, max_attraction)
+
+                    scale = attraction_force / distance
+                    disp_i[0] += dx * scale
+                    disp_i[1] += dy * scale
 
             # Обновляем позиции с учетом температуры
             temperature = initial_temperature * (1 - iteration / iterations)  # Постепенно снижаем температуру
 
-            for node in positions:
-                move_x = max(min(displacement[node][0], temperature), -temperature)
-                move_y = max(min(displacement[node][1], temperature), -temperature)
+            max_move = 0.0
+            for i in range(n):
+                move_x = max(min(disp[i][0], temperature), -temperature)
+                move_y = max(min(disp[i][1], temperature), -temperature)
 
-                positions[node][0] += move_x
-                positions[node][1] += move_y
+                pos[i][0] += move_x
+                pos[i][1] += move_y
+                max_move = max(max_move, abs(move_x), abs(move_y))
+
+            # Раскладка сошлась: остаточные смещения субпиксельные,
+            # дальнейшие итерации ничего не меняют
+            if max_move < 0.5:
+                break
+
+        # Словарь позиций восстанавливается один раз по завершении итераций
+        positions = {obj_id: pos[i] for i, obj_id in enumerate(ids)}
 
         # Проверяем и устраняем наложения после основного цикла
         positions = NetworkVisualizer._resolve_overlaps(positions, all_objects, padding)
 
         # Нормализуем позиции и применяем к объектам
+        right_edge = 0
         if positions:
-            min_x = min(pos[0] for pos in positions.values())
-            min_y = min(pos[1] for pos in positions.values())
-
-            for obj_id, pos in positions.items():
-                x = pos[0] - min_x
-                y = pos[1] - min_y
-
-                # Учитываем размеры объекта
-                width = all_objects[obj_id].get('width', 50)
-                height = all_objects[obj_id].get('height', 50)
-
-                if obj_id in objects['devices']:
-                    objects['devices'][obj_id]['x'] = x - width/2
-                    objects['devices'][obj_id]['y'] = y - height/2
-                elif obj_id in objects['networks']:
-                    objects['networks'][obj_id]['x'] = x - width/2
-                    objects['networks'][obj_id]['y'] = y - height/2
+            # оба минимума находятся за один проход по позициям
+            min_x = min_y = float('inf')
+            for pos_xy in positions.values():
+                if pos_xy[0] < min_x:
+                    min_x = pos_xy[0]
+                if pos_xy[1] < min_y:
+                    min_y = pos_xy[1]
+
+            # Обходим оба словаря напрямую - не нужно заново выяснять,
+            # к какому из них относится объект
+            for bucket in (objects['devices'], objects['networks']):
+                for obj_id, obj_data in bucket.items():
+                    pos = positions.get(obj_id)
+                    if pos is None:
+                        # изолированный узел, размещается сеткой ниже
+                        continue
+                    x = pos[0] - min_x
+                    y = pos[1] - min_y
+
+                    # Учитываем размеры объекта
+                    width = obj_data.get('width', 50)
+                    height = obj_data.get('height', 50)
+
+                    obj_data['x'] = x - width/2
+                    obj_data['y'] = y - height/2
+                    if x + width/2 > right_edge:
+                        right_edge = x + width/2
+
+        # Изолированные узлы упаковываются сеткой справа от основного графа
+        if isolated_ids:
+            cols = math.ceil(math.sqrt(len(isolated_ids)))
+            for k, obj_id in enumerate(isolated_ids):
+                obj_data = all_objects[obj_id]
+                width = obj_data.get('width', 50)
+                height = obj_data.get('height', 50)
+                obj_data['x'] = right_edge + padding + (k % cols) * (width + padding)
+                obj_data['y'] = (k // cols) * (height + padding)
 
         return objects
 
@@ -1369,24 +1418,25 @@ class NetworkVisualizer:
     def _resolve_overlaps(positions: dict, all_objects: dict, padding: int = 50) -> dict:
         """
         Метод для устранения наложений объектов после основного алгоритма
-        
+
         Args:
             positions (dict): Текущие позиции объектов
             all_objects (dict): Все объекты с информацией о размерах
             padding (int): Паддинг между объектами
-            
+
         Returns:
             dict: Обновленные позиции без наложений
         """
         import math
-        
+        sqrt = math.sqrt  # локальные имена для горячих циклов
+
         # Создаем копию позиций для модификации
         new_positions = positions.copy()
-        
+
         # Повторяем процесс устранения наложений несколько раз
         for _ in range(5):  # 5 итераций для устранения наложений
             overlaps_found = False
-            
+
             for obj1, pos1 in new_positions.items():
                 for obj2, pos2 in new_positions.items():
                     if obj1 != obj2:
@@ -1395,160 +1445,159 @@ class NetworkVisualizer:
                         h1 = all_objects[obj1].get('height', 50)
                         w2 = all_objects[obj2].get('width', 50)
                         h2 = all_objects[obj2].get('height', 50)
-                        
+
                         # Проверяем наложение по осям X и Y
                         x_overlap = abs(pos1[0] - pos2[0]) < (w1/2 + w2/2 + padding)
                         y_overlap = abs(pos1[1] - pos2[1]) < (h1/2 + h2/2 + padding)
-                        
+
                         if x_overlap and y_overlap:
                             # Обнаружено наложение, сдвигаем объекты
                             dx = pos2[0] - pos1[0]
                             dy = pos2[1] - pos1[1]
-                            distance = max(math.sqrt(dx*dx + dy*dy), 0.1)
-                            
+                            distance = max(sqrt(dx*dx + dy*dy), 0.1)
+
                             # Рассчитываем минимальное расстояние для предотвращения наложения
-                            min_dist = (math.sqrt(w1**2 + h1**2) + math.sqrt(w2**2 + h2**2))/2 + padding
-                            
+                            min_dist = (sqrt(w1**2 + h1**2) + sqrt(w2**2 + h2**2))/2 + padding
+
                             # Направление раздвижения
                             move_x = (dx / distance) * min_dist/2
                             move_y = (dy / distance) * min_dist/2
-                            
+
                             # Сдвигаем оба объекта в противоположные стороны
                             new_positions[obj1][0] -= move_x
                             new_positions[obj1][1] -= move_y
                             new_positions[obj2][0] += move_x
                             new_positions[obj2][1] += move_y
-                            
+
                             overlaps_found = True
-            
+
             # Если наложений не найдено, можно прекратить итерации
             if not overlaps_found:
                 break
-        
+
         return new_positions
 
     @staticmethod
     def layout_algorithm_clustered(objects: dict, padding: int = 50) -> dict:
         """
         Кластерный алгоритм размещения объектов - группировка связанных объектов
-        
+
         Args:
             objects (dict): Словарь с объектами {'devices': devices, 'networks': networks, 'links': links}
             padding (int): Паддинг вокруг объектов
-            
+
         Returns:
             dict: Модифицированный словарь с проставленными координатами
         """
         import math
-        
+        from collections import deque
+
         all_objects = {}
         all_objects.update(objects['devices'])
         all_objects.update(objects['networks'])
-        
+
         if len(all_objects) == 0:
             return objects
-        
+
+        # Размеры объектов считываются из словарей один раз
+        widths = {obj_id: obj_data.get('width', 50) for obj_id, obj_data in all_objects.items()}
+        heights = {obj_id: obj_data.get('height', 50) for obj_id, obj_data in all_objects.items()}
+
+        # Прямая ссылка на данные объекта вместо двух проверок принадлежности
+        # на каждую запись координат; устройства имеют приоритет при совпадении имён
+        owner = {}
+        for bucket in (objects['networks'], objects['devices']):
+            for obj_id, obj_data in bucket.items():
+                owner[obj_id] = obj_data
+
         # Создаем группы связанных объектов
         visited = set()
         clusters = []
-        
+
         # Создаем граф на основе связей
-        graph = {}
-        for link in objects['links']:
-            source = link['source']
-            target = link['target']
-            
-            if source not in graph:
-                graph[source] = []
-            if target not in graph:
-                graph[target] = []
-                
-            if target not in graph[source]:
-                graph[source].append(target)
-            if source not in graph[target]:
-                graph[target].append(source)
-        
+        graph = NetworkVisualizer._build_adjacency(objects['links'])
+
         # Находим компоненты связности (кластеры)
         for obj_id in all_objects.keys():
             if obj_id not in visited:
                 cluster = []
-                queue = [obj_id]
+                # deque: извлечение из головы очереди за O(1) вместо O(n) у list.pop(0)
+                queue = deque([obj_id])
                 visited.add(obj_id)
-                
+
                 while queue:
-                    current = queue.pop(0)
+                    current = queue.popleft()
                     cluster.append(current)
-                    
+
                     if current in graph:
                         for neighbor in graph[current]:
                             if neighbor not in visited and neighbor in all_objects:
                                 visited.add(neighbor)
                                 queue.append(neighbor)
-                
+
                 clusters.append(cluster)
-        
-        # Размещаем каждый кластер отдельно
-        current_x, current_y = 0, 0
-        max_cluster_height = 0
-        
-        for cluster in clusters:
-            # Для каждого кластера используем сеточный алгоритм
+
+        def place_cluster(cluster, start_x, start_y):
+            """Размещает один кластер сеткой; возвращает (сдвиг по x, высота)."""
             cluster_size = len(cluster)
             if cluster_size == 1:
                 obj_id = cluster[0]
-                width = all_objects[obj_id].get('width', 50)
-                height = all_objects[obj_id].get('height', 50)
-                
-                if obj_id in objects['devices']:
-                    objects['devices'][obj_id]['x'] = current_x
-                    objects['devices'][obj_id]['y'] = current_y
-                elif obj_id in objects['networks']:
-                    objects['networks'][obj_id]['x'] = current_x
-                    objects['networks'][obj_id]['y'] = current_y
-                
-                current_x += max(width, height) + padding
-                max_cluster_height = max(max_cluster_height, height)
-            else:
-                # Размещаем объекты кластера в сетке
-                cols = math.ceil(math.sqrt(cluster_size))
-                rows = math.ceil(cluster_size / cols) if cols > 0 else 0
-                
-                cluster_start_x = current_x
-                cluster_start_y = current_y
-                
-                i = 0
-                cluster_max_height = 0
-                
-                for obj_id in cluster:
-                    row = i // cols
-                    col = i % cols
-                    
-                    obj_width = all_objects[obj_id].get('width', 50)
-                    obj_height = all_objects[obj_id].get('height', 50)
-                    
-                    x = cluster_start_x + col * (obj_width + padding)
-                    y = cluster_start_y + row * (obj_height + padding)
-                    
-                    if obj_id in objects['devices']:
-                        objects['devices'][obj_id]['x'] = x
-                        objects['devices'][obj_id]['y'] = y
-                    elif obj_id in objects['networks']:
-                        objects['networks'][obj_id]['x'] = x
-                        objects['networks'][obj_id]['y'] = y
-                    
-                    cluster_max_height = max(cluster_max_height, obj_height)
-                    i += 1
-                
-                # Обновляем глобальные координаты
-                current_x += cols * (max([all_objects[obj_id].get('width', 50) for obj_id in cluster]) + padding)
-                max_cluster_height = max(max_cluster_height, rows * cluster_max_height + padding)
-        
+                width = widths[obj_id]
+                height = heights[obj_id]
+
+                obj_data = owner[obj_id]
+                obj_data['x'] = start_x
+                obj_data['y'] = start_y
+
+                return max(width, height) + padding, height
+
+            # Размещаем объекты кластера в сетке
+            cols = math.ceil(math.sqrt(cluster_size))
+            rows = math.ceil(cluster_size / cols) if cols > 0 else 0
+
+            # Максимумы размеров копятся в том же проходе, что и размещение,
+            # без повторного сканирования кластера
+            cluster_max_width = 0
+            cluster_max_height = 0
+
+            for i, obj_id in enumerate(cluster):
+                row = i // cols
+                col = i % cols
+
+                obj_width = widths[obj_id]
+                obj_height = heights[obj_id]
+
+                x = start_x + col * (obj_width + padding)
+                y = start_y + row * (obj_height + padding)
+
+                obj_data = owner[obj_id]
+                obj_data['x'] = x
+                obj_data['y'] = y
+
+                if obj_width > cluster_max_width:
+                    cluster_max_width = obj_width
+                if obj_height > cluster_max_height:
+                    cluster_max_height = obj_height
+
+            return (cols * (cluster_max_width + padding),
+                    rows * cluster_max_height + padding)
+
+        # Размещаем каждый кластер отдельно: кластеры независимы,
+        # упаковка ограничивающих прямоугольников идёт слева направо
+        current_x, current_y = 0, 0
+        max_cluster_height = 0
+
+        for cluster in clusters:
+            advance_x, cluster_height = place_cluster(cluster, current_x, current_y)
+            current_x += advance_x
+            max_cluster_height = max(max_cluster_height, cluster_height)
+
         return objects
 
     def create_drawio_diagram(self, objects: dict ):
         """
         Создает диаграмму draw.io из словаря объектов
-        
+
         Args:
             objects (dict): Словарь с объектами {'devices': devices, 'networks': networks, 'links': links}
         """
@@ -1639,28 +1688,28 @@ class NetworkVisualizer:
     def set_parent(drawio_node_object_xml: str, parent_id: str) -> str:
         """
         Процедура для замены значения атрибута parent в элементе mxCell
-        
+
         Args:
             drawio_node_object_xml (str): XML-строка объекта drawio в формате object
             parent_id (str): Новое значение для атрибута parent
-            
+
         Returns:
             str: Обновленная XML-строка с измененным значением parent
         """
         import re
-        
+
         # Проверяем, что parent_id не равен '0'
         if parent_id == '0':
             # Если parent_id равен '0', возвращаем оригинальную строку без изменений
             return drawio_node_object_xml
-        
+
         # Регулярное выражение для поиска элемента mxCell с атрибутом parent
         # Ищем <mxCell ... parent="..." ... >
         pattern = r'(<mxCell\s+[^>]*parent\s*=\s*["\'])([^"\']*)(["\'][^>]*>)'
-        
+
         # Заменяем найденное значение parent на новое
         updated_xml = re.sub(pattern, r'\g<1>' + str(parent_id) + r'\g<3>', drawio_node_object_xml)
-        
+
         return updated_xml
 
 
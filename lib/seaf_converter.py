@@ -12,6 +12,9 @@ import xml.etree.ElementTree as ET
 
 import yaml
 
+# C-реализация загрузчика YAML (libyaml), если она собрана в PyYAML
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class SchemaLoader:
     """Загрузчик YAML схем из указанного каталога."""
@@ -46,8 +49,9 @@ class SchemaLoader:
     def _load_yaml_file(file_path: Path) -> dict[str, Any] | None:
         """Загрузить отдельный YAML файл."""
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
+            # Бинарный режим: libyaml декодирует UTF-8 сам, без текстового слоя
+            with open(file_path, "rb") as f:
+                return yaml.load(f, Loader=_YAML_LOADER)
         except yaml.YAMLError as e:
             raise ValueError(f"Ошибка парсинга YAML файла {file_path}: {e}")
 
@@ -556,8 +560,8 @@ class DrawioConverter:
             return
 
         for yaml_file in self.patterns_dir.glob("*.yaml"):
-            with open(yaml_file, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
+            with open(yaml_file, "rb") as f:
+                data = yaml.load(f, Loader=_YAML_LOADER)
                 entities = data.get("entities", {})
                 for entity_name, entity_data in entities.items():
                     self._schemas[entity_name] = entity_data